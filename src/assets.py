@@ -0,0 +1,116 @@
+import os
+from collections import OrderedDict
+import pygame
+from settings import ap
+
+## one place every image, font and sound is loaded through, each (path, options) is loaded once and shared,
+## least recently used images are let go once their decoded size goes over the budget,
+## anything still using an image keeps it alive, the cache just stops holding on to it,
+## fonts and sounds are never let go, the glyph atlases and the sound bank keep them for good anyway
+
+
+_paths = {} ## path as asked for -> normalised, so a cache hit doesnt touch the file system functions
+
+
+def _path(path):
+    full = _paths.get(path)
+    if full is None:
+        full = _paths[path] = os.path.normcase(os.path.abspath(path)) ## "assets/x.png" and ap("x.png") are the same asset
+    return full
+
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+class AssetManager:
+    def __init__(self, budget_mb=128):
+        self.budget = int(budget_mb * 1048576)
+        self.entries = OrderedDict() ## (kind, path, options) -> [asset, bytes, converted], most recently used last
+        self.bytes = 0 ## images only, what the budget is checked against
+        self.pinned = {} ## (kind, path, options) -> [asset, bytes] for fonts and sounds
+        self.pinned_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def set_budget(self, budget_mb):
+        self.budget = int(budget_mb * 1048576)
+        self._evict()
+
+    def clear(self):
+        self.entries.clear() ## images only
+        self.bytes = 0
+
+    def _evict(self):
+        while self.bytes > self.budget and len(self.entries) > 1: ## the newest asset always stays, even when it alone is over
+            _, (_, size, _) = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def _store(self, key, asset, size, converted=True):
+        self.entries[key] = [asset, size, converted]
+        self.bytes += size
+        self.misses += 1
+        self._evict()
+        return asset
+
+    def _pin(self, key, asset, size):
+        self.pinned[key] = [asset, size]
+        self.pinned_bytes += size
+        self.misses += 1
+        return asset
+
+    def _hit(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        else:
+            entry = self.pinned.get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def image(self, path, size=None, alpha=True):
+        ## converted to the display format once there is a display, loaded as is before that (items load at import),
+        ## only the cached copy is converted, so anything loaded before the window asks again when drawing instead of keeping it
+        key = ("image", _path(path), (tuple(size) if size else None, alpha))
+        entry = self._hit(key)
+        if entry is not None:
+            if not entry[2] and pygame.display.get_surface() is not None:
+                entry[0] = entry[0].convert_alpha() if alpha else entry[0].convert() ## loaded before the window, converted now
+                self.bytes += surface_bytes(entry[0]) - entry[1]
+                entry[1] = surface_bytes(entry[0])
+                entry[2] = True
+            return entry[0]
+        surface = pygame.image.load(path)
+        converted = pygame.display.get_surface() is not None
+        if converted:
+            surface = surface.convert_alpha() if alpha else surface.convert()
+        if size:
+            surface = pygame.transform.scale(surface, size)
+        return self._store(key, surface, surface_bytes(surface), converted)
+
+    def font(self, size, path=None):
+        path = path or ap("fonts", "path.ttf") ## the game's font unless told otherwise
+        key = ("font", _path(path), size)
+        entry = self._hit(key)
+        if entry is not None:
+            return entry[0]
+        return self._pin(key, pygame.font.Font(path, size), os.path.getsize(path)) ## a new Font would mean a new glyph atlas
+
+    def sound(self, path):
+        key = ("sound", _path(path), None)
+        entry = self._hit(key)
+        if entry is not None:
+            return entry[0]
+        sound = pygame.mixer.Sound(path)
+        freq, fmt, channels = pygame.mixer.get_init()
+        return self._pin(key, sound, int(sound.get_length() * freq) * channels * (abs(fmt) // 8)) ## decoded samples
+
+    def stats(self):
+        return {"assets": len(self.entries) + len(self.pinned), "bytes": self.bytes, "pinned_bytes": self.pinned_bytes, "budget": self.budget,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+assets = AssetManager() ## shared by the whole game, main sets the budget from the settings
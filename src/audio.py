@@ -0,0 +1,84 @@
+import os
+import pygame
+from settings import ap
+from assets import assets
+
+## every sound effect is decoded once and played through a few reserved channels,
+## the volume is only pushed to the mixer when the audio settings actually change
+
+VOLUMES = {"Low": 0.33, "Medium": 0.66, "High": 1.0}
+MUSIC = {"pallet_town.mp3"} ## streamed with pygame.mixer.music, never decoded into memory
+
+
+def volume_level(audio):
+    if audio.get("mute"):
+        return 0
+    return VOLUMES.get(audio.get("volume"), 0)
+
+
+class SoundBank:
+    def __init__(self, folder=ap("audio"), channels=8):
+        self.folder = folder
+        self.channel_count = channels
+        self.channels = [] ## reserved so music and anything else using the mixer never take them
+        self.started = [] ## when each channel last started a sound, the oldest one is stolen when all are busy
+        self.sounds = {} ## lowercase file name -> decoded Sound
+        self.paths = None ## lowercase file name -> path, names are matched without caring about case
+        self.volume = None
+
+    def _init(self):
+        if self.channels:
+            return
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), self.channel_count))
+        pygame.mixer.set_reserved(self.channel_count)
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.channel_count)]
+        self.started = [0] * self.channel_count
+        self.paths = {name.lower(): os.path.join(self.folder, name) for name in os.listdir(self.folder)}
+
+    def get(self, name):
+        self._init()
+        key = name.lower()
+        sound = self.sounds.get(key)
+        if sound is None:
+            sound = assets.sound(self.paths[key]) ## KeyError for a sound that isnt in the folder
+            if self.volume is not None:
+                sound.set_volume(self.volume)
+            self.sounds[key] = sound
+        return sound
+
+    def preload(self):
+        ## decodes every effect up front so the first play of each one doesnt stall a frame
+        self._init()
+        for name in self.paths:
+            if name not in MUSIC:
+                self.get(name)
+
+    def play(self, name):
+        sound = self.get(name)
+        now = pygame.time.get_ticks()
+        free = [i for i, channel in enumerate(self.channels) if not channel.get_busy()]
+        i = free[0] if free else min(range(len(self.channels)), key=self.started.__getitem__) ## steals the oldest voice
+        self.channels[i].play(sound)
+        self.started[i] = now
+
+    def play_music(self, name, loops=-1):
+        self._init()
+        pygame.mixer.music.load(self.paths[name.lower()])
+        pygame.mixer.music.set_volume(self.volume or 0)
+        pygame.mixer.music.play(loops)
+
+    def apply_settings(self, audio):
+        ## cheap to call every frame, only touches the mixer when the level changed
+        self._init()
+        level = volume_level(audio)
+        if level == self.volume:
+            return
+        self.volume = level
+        pygame.mixer.music.set_volume(level)
+        for sound in self.sounds.values():
+            sound.set_volume(level)
+
+
+sounds = SoundBank() ## shared by the whole game
@@ -0,0 +1,1087 @@
+import os
+import subprocess
+import sys
+import time
+
+## small measurement scripts for the engine, run from the project root:
+##   python src/bench.py memory
+##   python src/bench.py collisions
+##   python src/bench.py animation
+##   python src/bench.py tiles
+##   python src/bench.py scroll
+##   python src/bench.py zones
+##   python src/bench.py sprites
+##   python src/bench.py swarm
+##   python src/bench.py spatial
+##   python src/bench.py projectiles
+##   python src/bench.py audio
+##   python src/bench.py pets
+##   python src/bench.py flow
+##   python src/bench.py ai
+##   python src/bench.py entities
+##   python src/bench.py timestep
+##   python src/bench.py hud
+##   python src/bench.py text
+##   python src/bench.py menus
+##   python src/bench.py thumbnails
+##   python src/bench.py assets
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") ## lets the benchmarks run without opening a window
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MAP = os.path.join("assets", "maps", "bananas_map.tmx")
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    with open("/proc/self/statm") as f: ## linux fallback when psutil isnt installed
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def init_display(size=(1280, 720)):
+    import pygame
+    pygame.init()
+    return pygame.display.set_mode(size)
+
+
+class Target:
+    ## stands in for the player in the enemy benches, adds up the damage it takes
+    x, y = 2000.0, 1900.0
+
+    def __init__(self):
+        self.hits = 0
+
+    def take_damage(self, amount):
+        self.hits += amount
+
+
+def _memory_case(case):
+    ## runs inside its own process so each number starts from a clean interpreter
+    init_display()
+    import numpy
+    import pytmx
+    from world import World ## libraries are imported first so only the map itself is counted
+    before = rss_mb()
+    start = time.perf_counter()
+    if case == "pytmx":
+        tmx = pytmx.load_pygame(MAP)
+        layers = [layer.data for layer in tmx.layers if isinstance(layer, pytmx.TiledTileLayer)]
+    else:
+        world = World(MAP)
+        layers = [layer.data for layer in world.map.layers]
+    elapsed = time.perf_counter() - start
+    if case == "pytmx":
+        layer_bytes = _nested_size(layers)
+    else:
+        layer_bytes = sum(layer.nbytes for layer in layers)
+    print(f"{case:>6}: {rss_mb() - before:6.1f} MB resident for the map, "
+          f"tile layers {layer_bytes / (1024 * 1024):5.1f} MB, load {elapsed * 1000:5.0f} ms")
+
+
+def _nested_size(layers):
+    ## size of nested lists of ints, counting each distinct int object once
+    seen = set()
+    total = 0
+    for layer in layers:
+        total += sys.getsizeof(layer)
+        for row in layer:
+            total += sys.getsizeof(row)
+            for value in row:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    total += sys.getsizeof(value)
+    return total
+
+
+def bench_memory():
+    ## before: pytmx keeps every layer as nested lists of python ints
+    ## after: World keeps them as uint16 arrays mapped straight from the compiled cache
+    for case in ("pytmx", "world"):
+        subprocess.run([sys.executable, __file__, "_memory", case], check=True)
+
+
+def bench_collisions(count=200000):
+    ## checks collides_fast, collides_array and collides_point against the exact rect path over random rects across
+    ## the whole map, once with just the object layer and once with the tile layer merged in, then times both,
+    ## exits non zero on any disagreement so it can gate a change
+    import random
+    import numpy as np
+    import pygame
+    from world import World
+    init_display()
+    rng = random.Random(5)
+    failures = []
+
+    for solid_layers in ((), ("Collide blocks BG",)):
+        world = World(MAP, solid_layers=solid_layers)
+        rects = []
+        for _ in range(count):
+            w = rng.choice((0, 1, 10, 48, 60, 140, rng.randint(1, 400)))
+            h = rng.choice((0, 1, 10, 48, 60, 160, rng.randint(1, 400)))
+            rects.append(pygame.Rect(rng.randint(-200, world.width_px + 200), rng.randint(-200, world.height_px + 200), w, h))
+        points = [(rng.uniform(-100, world.width_px + 100), rng.uniform(-100, world.height_px + 100)) for _ in range(count)]
+
+        exact = [world.collides(r) for r in rects]
+        fast = [world.collides_fast(r) for r in rects]
+        mismatches = sum(a != b for a, b in zip(exact, fast))
+        batch = world.collides_array(np.array([r.x for r in rects]), np.array([r.y for r in rects]),
+                                     np.array([r.w for r in rects]), np.array([r.h for r in rects]))
+        array_mismatches = int(np.count_nonzero(batch != np.array(exact)))
+        point_mismatches = sum(world.collides_point(x, y) != any(c.collidepoint(x, y) for c in world.collision_rects)
+                               for x, y in points[:20000])
+
+        start = time.perf_counter()
+        for r in rects:
+            world.collides(r)
+        exact_us = (time.perf_counter() - start) / count * 1e6
+        start = time.perf_counter()
+        for r in rects:
+            world.collides_fast(r)
+        fast_us = (time.perf_counter() - start) / count * 1e6
+
+        label = "objects + tiles" if solid_layers else "objects only"
+        print(f"{label:>15}: {len(world.collision_rects)} rects, {sum(exact)} hits, "
+              f"{mismatches} rect mismatches, {array_mismatches} batch mismatches, {point_mismatches} point mismatches, "
+              f"exact {exact_us:.2f} us, fast {fast_us:.2f} us")
+        for name, n in (("collides_fast", mismatches), ("collides_array", array_mismatches), ("collides_point", point_mismatches)):
+            if n:
+                failures.append(f"{label}: {name} disagrees with collides on {n} queries")
+    if failures:
+        print("\n".join(failures))
+        sys.exit(1)
+    print("ok, every fast path agrees with collides")
+
+
+def bench_animation(frames=1200):
+    ## per frame cost of animated tiles on a full screen view over the animated water, simulating 120 fps
+    from world import World
+    screen = init_display()
+    world = World(MAP)
+    cam_x, cam_y = 1200, 0
+    world.animator.update(0)
+    world.bg_cache.draw(screen, cam_x, cam_y)
+    world.fg_cache.draw(screen, cam_x, cam_y) ## bakes the chunks first so only the animation is being timed
+
+    times = []
+    for i in range(frames):
+        start = time.perf_counter()
+        world.animator.update(i * 1000 // 120)
+        for cache in (world.bg_cache, world.fg_cache):
+            for cy in range(0, 2):
+                for cx in range(2, 5):
+                    cache.get(cx, cy) ## refreshes the stale animated cells, same as draw does
+        times.append(time.perf_counter() - start)
+
+    cells = sum(len(c.animated) for cache in (world.bg_cache, world.fg_cache) for c in cache.chunks.values() if c)
+    print(f"{len(world.animator.animations)} animated tiles, {cells} animated cells on screen, "
+          f"{world.animator.version} frame changes over {frames} frames")
+    print(f"mean {sum(times) / len(times) * 1e6:.1f} us per frame, worst {max(times) * 1e6:.1f} us")
+
+
+def bench_tiles():
+    ## tileset load time and tile memory, pytmx.load_pygame against the packed atlas loader
+    import pytmx
+    from mapcache import load_map
+    from tileset import load_tilesets, load_tile_images, load_tile_animations
+    init_display()
+
+    start = time.perf_counter()
+    tmx = pytmx.load_pygame(MAP)
+    pytmx_ms = (time.perf_counter() - start) * 1000
+    images = [img for img in tmx.images if img]
+    pytmx_bytes = sum(img.get_width() * img.get_height() * img.get_bytesize() for img in images)
+
+    compiled = load_map(MAP) ## builds the cache if it isnt there yet so only tile loading is timed below
+    start = time.perf_counter()
+    tilesets = load_tilesets(compiled.tilesets, compiled.gids)
+    tiles = load_tile_images(tilesets, compiled.gids)
+    load_tile_animations(tilesets, compiled.gids)
+    atlas_ms = (time.perf_counter() - start) * 1000
+    atlas_bytes = sum(ts.nbytes() for ts in tilesets)
+
+    print(f"pytmx.load_pygame: {pytmx_ms:6.0f} ms for map + tiles, {len(images)} separate tile surfaces, "
+          f"{pytmx_bytes / (1024 * 1024):.1f} MB of tile pixels")
+    print(f"     atlas loader: {atlas_ms:6.0f} ms for tiles, {len(tilesets)} atlases serving "
+          f"{sum(1 for t in tiles if t)} tiles, {atlas_bytes / (1024 * 1024):.1f} MB of tile pixels")
+
+
+def bench_scroll(frames=600):
+    ## per frame background cost while walking, full chunk redraw against the scroll reuse renderer,
+    ## every scrolled frame is also checked against a full redraw
+    import math
+    import pygame
+    from world import World, ScrollRenderer
+    screen = init_display()
+    world = World(MAP)
+    scroller = ScrollRenderer(world.bg_cache)
+    check = pygame.Surface(screen.get_size()).convert()
+
+    path = []
+    x, y = 1400.0, 300.0
+    for i in range(frames):
+        angle = i / 90.0
+        x += math.cos(angle) * 200 / 120 * 2.5 ## dashing speed at 120 fps, the camera moves a few px a frame
+        y += math.sin(angle) * 200 / 120 * 2.5
+        path.append((int(x), int(y)))
+    path[frames // 2] = (3000, 2500) ## a teleport in the middle
+    for cam in path:
+        world.bg_cache.draw(screen, *cam) ## bakes every chunk on the path up front
+
+    results = {}
+    for name in ("full", "scroll"):
+        start = time.perf_counter()
+        for i, cam in enumerate(path):
+            world.animator.update(i * 1000 // 120)
+            if name == "full":
+                world.bg_cache.draw(screen, *cam)
+            else:
+                if i == frames // 2:
+                    scroller.invalidate()
+                scroller.draw(screen, *cam)
+        results[name] = (time.perf_counter() - start) / frames * 1e6
+
+    mismatches = 0
+    scroller.invalidate()
+    edge = [(200 - 3 * i, 150 - 3 * i) for i in range(150)] ## then out past the top left corner where there are no chunks
+    for i, cam in enumerate(path + edge):
+        world.animator.update(i * 1000 // 120)
+        if i == frames // 2:
+            scroller.invalidate()
+        scroller.draw(screen, *cam)
+        check.fill((0, 0, 0))
+        world.bg_cache.draw(check, *cam)
+        mismatches += pygame.image.tobytes(screen, "RGB") != pygame.image.tobytes(check, "RGB")
+
+    print(f"full redraw {results['full']:.0f} us per frame, scroll reuse {results['scroll']:.0f} us per frame, "
+          f"{mismatches} frames differing from a full redraw")
+
+
+def bench_zones(frames=240):
+    ## per frame enemy cost with every enemy updated against only the enemies in zones near the player,
+    ## for the normal enemy count and a much bigger one spread over the same map
+    import random
+    from classes import Enemy
+    from world import World
+    from zones import EnemyZones
+    init_display()
+    world = World(MAP)
+    sprite = os.path.join("assets", "characters", "Enemy", sorted(os.listdir(os.path.join("assets", "characters", "Enemy")))[0])
+
+    player = Target()
+    for count in (40, 400, 4000):
+        rng = random.Random(count)
+        enemies = [Enemy(f"Enemy {i}", rng.uniform(0, 5000), rng.uniform(0, 5000), 300, 50, 2, 200, sprite)
+                   for i in range(count)]
+        zones = EnemyZones(world.enemy_zones, enemies)
+        results = {}
+        for name in ("all", "zones"):
+            start = time.perf_counter()
+            for _ in range(frames):
+                active = enemies if name == "all" else zones.update(player.x, player.y)
+                for enemy in active:
+                    enemy.track(player, 1 / 120, active, world.collides_fast)
+            results[name] = (time.perf_counter() - start) / frames * 1000
+        print(f"{count:5} enemies: all {results['all']:7.2f} ms per frame, "
+              f"zoned {results['zones']:6.2f} ms per frame with {len(zones.active)} awake")
+
+
+def bench_sprites(rounds=5):
+    ## enemy construction with an empty clip registry (every sheet decoded and scaled, like before)
+    ## against a warm one, and the frame pixels each enemy ends up holding on its own
+    import sprites
+    from assets import assets
+    from game import make_enemies
+    init_display()
+
+    cold, warm = [], []
+    for _ in range(rounds):
+        sprites.clips.clear()
+        assets.clear() ## the sheets are kept there too
+        start = time.perf_counter()
+        enemies = make_enemies()
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        enemies = make_enemies() ## same as going back to the menu and starting again, or the boss spawning support enemies
+        warm.append(time.perf_counter() - start)
+
+    per_enemy_before = 12 * 64 * 64 * 4 ## 12 scaled 64x64 frames each
+    print(f"{len(enemies)} enemies: cold registry {min(cold) * 1000:.1f} ms, warm registry {min(warm) * 1000:.2f} ms")
+    print(f"frame pixels: {per_enemy_before * len(enemies) / 1024:.0f} KB when every enemy cut its own frames, "
+          f"{sprites.clip_bytes() / 1024:.0f} KB shared in {len(sprites.clips)} clips")
+
+
+def bench_swarm():
+    ## EnemySwarm.track against Enemy.track for crowds around the player, checked first and then timed
+    import random
+    from types import SimpleNamespace
+    from classes import Enemy
+    from swarm import EnemySwarm, SwarmEnemy
+    from world import World
+    init_display()
+    world = World(MAP)
+    sprite = os.path.join("assets", "characters", "Enemy", "Enemy 01-1.png")
+
+    dt = 1 / 120
+    for count in (50, 500, 5000):
+        rng = random.Random(count)
+        spread = 150 + count ** 0.5 * 30 ## keeps the crowd dense enough that separation matters
+        spots = [(Target.x + rng.uniform(-spread, spread), Target.y + rng.uniform(-spread, spread),
+                  rng.uniform(-0.5, 1.0)) for _ in range(count)]
+        swarm = EnemySwarm()
+        crowd = [SwarmEnemy(swarm, f"Enemy {i}", x, y, 300, 50, 2, 200, sprite) for i, (x, y, _) in enumerate(spots)]
+        plain = [Enemy(f"Enemy {i}", x, y, 300, 50, 2, 200, sprite) for i, (x, y, _) in enumerate(spots)]
+        for a, b, (_, _, timer) in zip(crowd, plain, spots):
+            a.attack_timer = b.attack_timer = timer
+
+        ## one step from the same start, track sees a snapshot so both see the same neighbour positions
+        snapshot = [SimpleNamespace(x=e.x, y=e.y) for e in plain]
+        ref, fast = Target(), Target()
+        for e in plain:
+            e.track(ref, dt, snapshot, world.collides_fast)
+        swarm.track(crowd, fast, dt, world.collides_array)
+        worst = max(max(abs(a.x - b.x), abs(a.y - b.y)) for a, b in zip(crowd, plain))
+        differ = sum((a.direction, a.anim_frame, a.tracking) != (b.direction, b.anim_frame, b.tracking) or
+                     abs(a.attack_timer - b.attack_timer) > 1e-9 for a, b in zip(crowd, plain))
+        if worst > 1e-6 or differ or ref.hits != fast.hits:
+            raise SystemExit(f"swarm disagrees with Enemy.track: {worst} px, {differ} enemies differ")
+
+        frames = max(1, 20000 // count) if count > 50 else 200
+        slow_frames = max(1, 200000 // (count * count)) ## the python loop is quadratic, keeps 5000 from taking minutes
+        start = time.perf_counter()
+        for _ in range(slow_frames):
+            for e in plain:
+                e.track(ref, dt, plain, world.collides_fast)
+        slow = (time.perf_counter() - start) / slow_frames * 1000
+        start = time.perf_counter()
+        for _ in range(frames):
+            swarm.track(crowd, fast, dt, world.collides_array)
+        quick = (time.perf_counter() - start) / frames * 1000
+        print(f"{count:5} enemies: Enemy.track {slow:9.2f} ms per frame, swarm {quick:6.2f} ms per frame, "
+              f"max difference {worst:.1e} px")
+
+
+def bench_spatial(frames=60):
+    ## Enemy.track walking the whole list for separation against asking the spatial hash,
+    ## both crowds start the same and must stay in the same places
+    import random
+    import pygame
+    from classes import Enemy
+    from spatial import SpatialHash
+    from world import World
+    init_display()
+    world = World(MAP)
+    sprite = os.path.join("assets", "characters", "Enemy", "Enemy 01-1.png")
+
+    player = Target()
+    for count in (50, 200, 800):
+        rng = random.Random(count)
+        spread = 100 + count ** 0.5 * 12
+        spots = [(player.x + rng.uniform(-spread, spread), player.y + rng.uniform(-spread, spread)) for _ in range(count)]
+        plain = [Enemy(f"Enemy {i}", x, y, 300, 50, 2, 200, sprite) for i, (x, y) in enumerate(spots)]
+        hashed = [Enemy(f"Enemy {i}", x, y, 300, 50, 2, 200, sprite) for i, (x, y) in enumerate(spots)]
+        neighbours = SpatialHash()
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            for e in plain:
+                e.track(player, 1 / 120, plain, world.collides_fast)
+        slow = (time.perf_counter() - start) / frames * 1000
+        start = time.perf_counter()
+        for _ in range(frames):
+            neighbours.rebuild(hashed)
+            for e in hashed:
+                e.track(player, 1 / 120, hashed, world.collides_fast, neighbours=neighbours)
+        quick = (time.perf_counter() - start) / frames * 1000
+        worst = max(max(abs(a.x - b.x), abs(a.y - b.y)) for a, b in zip(plain, hashed))
+
+        hit_rect = pygame.Rect(int(player.x), int(player.y), 32, 32)
+        melee = sorted(e.name for e in plain if hit_rect.colliderect(e.rect()))
+        neighbours.rebuild(plain)
+        melee_hashed = sorted(e.name for e in neighbours.query_rect(hit_rect, 80) if hit_rect.colliderect(e.rect()))
+        print(f"{count:4} enemies: list {slow:6.2f} ms per frame, hash {quick:5.2f} ms per frame, "
+              f"max drift {worst:.1e} px after {frames} frames, melee hits match: {melee == melee_hashed}")
+
+
+def _old_projectiles(shots, enemies, dt, frames):
+    ## the list of dicts update the pool replaced, returns how many hits landed
+    import pygame
+    projectiles = [{"rect": pygame.Rect(x, y, 10, 10), "direction": d, "speed": 600} for x, y, d in shots]
+    hits = 0
+    for _ in range(frames):
+        for projectile in projectiles[:]:
+            move_amount = projectile["speed"] * dt
+            if projectile["direction"] == "up":
+                projectile["rect"].y -= move_amount
+            elif projectile["direction"] == "down":
+                projectile["rect"].y += move_amount
+            elif projectile["direction"] == "left":
+                projectile["rect"].x -= move_amount
+            elif projectile["direction"] == "right":
+                projectile["rect"].x += move_amount
+            if not (0 <= projectile["rect"].x <= 10000 and 0 <= projectile["rect"].y <= 20000):
+                projectiles.remove(projectile)
+                continue
+            for enemy in enemies:
+                if projectile["rect"].colliderect(enemy.rect()):
+                    hits += 1
+                    projectiles.remove(projectile)
+                    break
+    return hits
+
+
+def bench_projectiles():
+    ## hits against the old list of dicts at normal and spiking frame times, then the cost of thousands of live shots
+    import random
+    from types import SimpleNamespace
+    import pygame
+    from projectiles import ProjectilePool
+    from world import World
+    init_display()
+    world = World(MAP)
+    rng = random.Random(3)
+
+    enemies = [SimpleNamespace(x=rng.uniform(1700, 2300), y=rng.uniform(1600, 2200)) for _ in range(40)]
+    for e in enemies:
+        e.rect = lambda e=e: pygame.Rect(int(e.x - 24), int(e.y - 30), 48, 60)
+    shots = [(rng.randint(1600, 2400), rng.randint(1500, 2300), rng.choice(("up", "down", "left", "right"))) for _ in range(2000)]
+
+    for dt, frames in ((1 / 120, 240), (1 / 10, 24)): ## 5 px a frame, then 60 px a frame
+        old = _old_projectiles(shots, enemies, dt, frames)
+        pool = ProjectilePool()
+        for shot in shots:
+            pool.spawn(*shot)
+        new = sum(len(pool.update(dt, enemies)) for _ in range(frames))
+        print(f"dt {dt * 1000:5.1f} ms: {old} hits with the old list, {new} with the swept pool")
+
+    for count in (1000, 5000, 20000):
+        pool = ProjectilePool()
+        screen = pygame.display.get_surface()
+        frames, spent, drawn = 0, 0.0, 0.0
+        while frames < 120:
+            while len(pool) < count: ## keeps the pool topped up as shots hit walls
+                pool.spawn(rng.uniform(1000, 3000), rng.uniform(1000, 3000), rng.choice(("up", "down", "left", "right")))
+            start = time.perf_counter()
+            pool.update(1 / 120, enemies, world.collides_array)
+            spent += time.perf_counter() - start
+            start = time.perf_counter()
+            pool.draw(screen, 1360, 1540)
+            drawn += time.perf_counter() - start
+            frames += 1
+        print(f"{count:6} live projectiles: update {spent / frames * 1000:.2f} ms, draw {drawn / frames * 1000:.2f} ms per frame")
+
+    ## two shots on opposite sides of the map, one bounding rect over both asks the hash for nearly every enemy
+    from spatial import SpatialHash
+    crowd = [SimpleNamespace(x=rng.uniform(0, 5000), y=rng.uniform(0, 5000)) for _ in range(4000)]
+    neighbours = SpatialHash()
+    neighbours.rebuild(crowd)
+    pool = ProjectilePool()
+    pool.spawn(200, 200, "right")
+    pool.spawn(4800, 4800, "left")
+    rects = pool.swept_rects(1 / 60)
+    union = rects[0].unionall(rects[1:])
+    start = time.perf_counter()
+    whole = neighbours.query_rect(union, 80)
+    whole_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    near = {id(e): e for rect in rects for e in neighbours.query_rect(rect, 80)}
+    near_ms = (time.perf_counter() - start) * 1000
+    print(f"2 shots far apart: one bounding rect {len(whole)} enemies in {whole_ms:.2f} ms, "
+          f"{len(rects)} block rects {len(near)} enemies in {near_ms:.3f} ms")
+
+
+def bench_audio(swings=50):
+    ## cost of one sword swing sound, decoding the mp3 every time against the preloaded bank
+    import pygame
+    from audio import SoundBank
+    init_display()
+    pygame.mixer.init()
+    path = os.path.join("assets", "audio", "X-Scissor.mp3")
+
+    start = time.perf_counter()
+    for _ in range(swings):
+        pygame.mixer.Sound(path).play()
+    decode = (time.perf_counter() - start) / swings * 1000
+
+    bank = SoundBank(channels=4)
+    start = time.perf_counter()
+    bank.preload()
+    preload = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(swings):
+        bank.play("x-scissor.mp3")
+    played = (time.perf_counter() - start) / swings * 1000
+    print(f"decode per swing {decode:.2f} ms, bank preload {preload:.1f} ms once, bank play {played:.3f} ms per swing")
+
+
+def bench_pets(draws=2000):
+    ## pet draw with the per frame rescale against the pre scaled frames, and what listing the roster costs
+    ## against decoding every species
+    import pygame
+    from classes import PetRoster
+    screen = init_display()
+    folder = os.path.join("assets", "pets", "pokemon_slices")
+    small = pygame.image.load(os.path.join(folder, "Mew", "frame_0.png")).convert_alpha()
+
+    start = time.perf_counter()
+    for _ in range(draws):
+        screen.blit(pygame.transform.scale(small, (64, 64)), (100, 100))
+    scaled = (time.perf_counter() - start) / draws * 1e6
+    roster = PetRoster()
+    img = roster.frames("Mew")[0]
+    start = time.perf_counter()
+    for _ in range(draws):
+        screen.blit(img, (100, 100))
+    cached = (time.perf_counter() - start) / draws * 1e6
+
+    start = time.perf_counter()
+    names = PetRoster().species()
+    listing = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for name in names:
+        roster.frames(name)
+    decode_all = (time.perf_counter() - start) * 1000
+    again = roster.frames("Mew") is roster.frames("Mew") and PetRoster().frames("Mew")[0] is img
+    print(f"pet draw: {scaled:.1f} us rescaling every frame, {cached:.1f} us pre scaled")
+    print(f"roster of {len(names)} species: {listing:.1f} ms to list, {decode_all:.0f} ms to decode all "
+          f"{len(names) * 8} frames up front, frames shared between rosters: {again}")
+
+
+def bench_flow(walkers=40, frames=900):
+    ## flow field build times, then how many enemies starting around the player actually reach them
+    ## when steering straight at them against following the field
+    import math
+    import random
+    from classes import Enemy
+    from pathfinding import FlowField
+    from world import World
+    init_display()
+    world = World(MAP)
+    sprite = os.path.join("assets", "characters", "Enemy", "Enemy 01-1.png")
+
+    field = FlowField(world)
+    start = time.perf_counter()
+    field.update(2000, 1900)
+    local = (time.perf_counter() - start) * 1000
+    steps, x, y = [], 2000, 1900
+    for dx, dy in [(32, 0)] * 4 + [(0, 32)] * 4 + [(-32, 0)] * 4 + [(0, -32)] * 4:
+        x, y = x + dx, y + dy
+        start = time.perf_counter()
+        field.update(x, y)
+        steps.append(time.perf_counter() - start)
+    whole = FlowField(world, radius=max(world.map.width, world.map.height))
+    start = time.perf_counter()
+    whole.update(2000, 1900)
+    full = (time.perf_counter() - start) * 1000
+    print(f"field {field.w}x{field.h} tiles: build {local:.1f} ms, one tile step {sum(steps) / len(steps) * 1000:.2f} ms; "
+          f"whole {world.map.width}x{world.map.height} map {full:.0f} ms")
+
+    rng = random.Random(11)
+    players = [(2000, 1900), (1200, 2200), (600, 1850), (2990, 2549)]
+    spots = []
+    for n, (px, py) in enumerate(players):
+        field = FlowField(world)
+        field.update(px, py)
+        while len(spots) < walkers * (n + 1) // len(players):
+            sx, sy = px + rng.uniform(-390, 390), py + rng.uniform(-390, 390)
+            ## inside tracking range, not in a wall, and with a walkable way to the player (other rooms cant be reached either way)
+            if (math.hypot(sx - px, sy - py) < 390 and field.direction(sx, sy) is not None and
+                    not world.collides_fast(Enemy.rect(type("", (), {"x": sx, "y": sy})()))):
+                spots.append((px, py, sx, sy))
+    for label, flow_on in (("straight", False), ("flow field", True)):
+        reached = 0
+        for px, py, sx, sy in spots:
+            player = Target()
+            player.x, player.y = px, py
+            enemy = Enemy("walker", sx, sy, 300, 50, 2, 200, sprite)
+            flow = FlowField(world) if flow_on else None
+            if flow:
+                flow.update(px, py)
+            for _ in range(frames):
+                enemy.track(player, 1 / 120, [enemy], world.collides_fast, 400, 50, flow=flow)
+                if ((enemy.x - px) ** 2 + (enemy.y - py) ** 2) ** 0.5 <= 60:
+                    reached += 1
+                    break
+        print(f"{label:>10}: {reached}/{len(spots)} enemies reached the player within {frames / 120:.1f} s")
+
+
+def bench_ai(frames=240):
+    ## enemy AI cost per frame with every enemy tracked every frame against the scheduler,
+    ## the scheduler should stay near its budget however many enemies there are
+    import random
+    from classes import Enemy
+    from scheduler import AIScheduler
+    from spatial import SpatialHash
+    from world import World
+    init_display()
+    world = World(MAP)
+    sprite = os.path.join("assets", "characters", "Enemy", "Enemy 01-1.png")
+
+    player = Target()
+    for count in (40, 400, 2000):
+        rng = random.Random(count)
+        results = {}
+        for name in ("every frame", "scheduled"):
+            enemies = [Enemy(f"Enemy {i}", player.x + rng.uniform(-600, 600), player.y + rng.uniform(-600, 600),
+                             300, 50, 2, 200, sprite) for i in range(count)]
+            neighbours = SpatialHash()
+            ai = AIScheduler()
+            times, updates = [], 0
+            for _ in range(frames):
+                start = time.perf_counter()
+                neighbours.rebuild(enemies)
+                if name == "every frame":
+                    for e in enemies:
+                        e.track(player, 1 / 120, enemies, world.collides_fast, neighbours=neighbours)
+                    updates += len(enemies)
+                else:
+                    for e, e_dt in ai.due(enemies, player, 1 / 120):
+                        e.track(player, e_dt, enemies, world.collides_fast, neighbours=neighbours)
+                    updates += ai.updated
+                times.append(time.perf_counter() - start)
+            results[name] = (sum(times) / frames * 1000, max(times[10:]) * 1000, updates / frames)
+        line = ", ".join(f"{k} {mean:.2f} ms (worst {worst:.2f}) {ups:.0f} updates" for k, (mean, worst, ups) in results.items())
+        print(f"{count:5} enemies: {line} per frame")
+
+    ## at the 60 Hz simulation rate a far enemy waits 10 steps, 0.17 s, which is more than one update's max_dt
+    ai = AIScheduler(budget_ms=1000)
+    far = [Enemy(f"Enemy {i}", player.x + 1000 + i, player.y, 300, 50, 2, 200, sprite) for i in range(20)]
+    given = 0.0
+    for _ in range(600):
+        for e, e_dt in ai.due(far, player, 1 / 60):
+            assert e_dt <= ai.max_dt + 1e-9
+            given += e_dt
+    owed = 600 / 60 * len(far) - sum(ai.pending.values())
+    print(f"far enemies at 60 Hz: {given:.2f} s of AI time simulated of {owed:.2f} s waited")
+
+
+class _Loose:
+    ## stands in for the old entity classes, same attributes kept in a per instance __dict__
+    def __init__(self, values):
+        for name, value in values:
+            setattr(self, name, value)
+
+
+def _slot_values(obj):
+    names = [n for cls in reversed(type(obj).__mro__) for n in cls.__dict__.get("__slots__", ())]
+    return [(n, getattr(obj, n)) for n in names if hasattr(obj, n)]
+
+
+def bench_entities(count=10000):
+    ## bytes each enemy and ground item costs on its own, values like x and hp are the same either way,
+    ## before: a __dict__ per object and every ground item its own Item with its own decoded image
+    ## after: slotted objects and ground items that only point at the shared Item
+    import random
+    import tracemalloc
+    from classes import Enemy, ItemDrop
+    from items import items
+    init_display()
+    sprite = os.path.join("assets", "characters", "Enemy", "Enemy 01-1.png")
+    rng = random.Random(8)
+
+    enemies = [Enemy(f"Enemy {i}", rng.uniform(0, 5000), rng.uniform(0, 5000), 300, 50, 2, 200, sprite) for i in range(count)]
+    drops = [ItemDrop(rng.choice(items), rng.randint(0, 5000), rng.randint(0, 5000)) for _ in range(count)]
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    loose_enemies = [_Loose(_slot_values(e)) for e in enemies]
+    enemy_before = (tracemalloc.get_traced_memory()[0] - start) / count
+    start = tracemalloc.get_traced_memory()[0]
+    loose_items = [_Loose(_slot_values(d.item) + [("x", d.x), ("y", d.y)]) for d in drops]
+    item_before = (tracemalloc.get_traced_memory()[0] - start) / count
+    tracemalloc.stop()
+
+    image = items[0].image
+    image_bytes = image.get_pitch() * image.get_height() + sys.getsizeof(image) ## what one more decoded 64x64 image costs
+    enemy_after = sum(sys.getsizeof(e) for e in enemies) / count
+    item_after = sum(sys.getsizeof(d) for d in drops) / count
+    print(f"enemies: {enemy_before:.0f} bytes each with a __dict__, {enemy_after:.0f} slotted")
+    print(f"ground items: {item_before + image_bytes:.0f} bytes each as a full Item with its own image, "
+          f"{item_after:.0f} as an ItemDrop over {len(items)} shared Items")
+    print(f"{count} of each: {(enemy_before + item_before + image_bytes) * count / 1048576:.1f} MB before, "
+          f"{(enemy_after + item_after) * count / 1048576:.1f} MB after")
+    del loose_enemies, loose_items
+
+
+def bench_timestep(seconds=5.0):
+    ## the same walk towards the player played back at different frame rates, with the old variable dt loop
+    ## and with the fixed step loop, the fixed step should end in the same place every time and only simulate 60 times a second,
+    ## the pet following along should change walk frame as often at every frame rate too
+    import random
+    from types import SimpleNamespace
+    from classes import Enemy, Pet
+    from timestep import FixedStep
+    from world import World
+    init_display()
+    world = World(MAP)
+    sprite = os.path.join("assets", "characters", "Enemy", "Enemy 01-1.png")
+
+    player = Target()
+    starts = [(player.x + dx, player.y + dy) for dx, dy in ((-350, 0), (300, 200), (-120, -330), (250, -250))]
+    ends = {}
+    for fps in (30, 60, 144, 240):
+        rng = random.Random(fps)
+        frames = [rng.uniform(0.7, 1.3) / fps for _ in range(int(seconds * fps))] ## uneven frame times around the target rate
+        for loop in ("variable dt", "fixed step"):
+            enemies = [Enemy(f"Enemy {i}", x, y, 300, 50, 2, 200, sprite) for i, (x, y) in enumerate(starts)]
+            step = FixedStep(60)
+            pet = Pet(SimpleNamespace(x=player.x, y=player.y, direction="down"), "Mew")
+            sims = flips = 0
+            for frame_dt in frames:
+                if loop == "variable dt":
+                    runs = [frame_dt]
+                else:
+                    runs = [step.dt] * step.steps(frame_dt)
+                for dt in runs:
+                    for e in enemies:
+                        e.track(player, dt, enemies, world.collides_fast)
+                    sims += 1
+                    if loop == "fixed step":
+                        shown = pet.anim_frame
+                        pet.update(SimpleNamespace(x=player.x, y=player.y, direction="down"), dt)
+                        flips += pet.anim_frame != shown
+            if loop == "variable dt":
+                flips = len(frames) // 10 ## the old pet moved on a frame every 10 drawn frames
+            ends.setdefault(loop, []).append([(e.x, e.y) for e in enemies])
+            print(f"{fps:4} fps {loop:>12}: {sims:5} updates, first enemy ends at ({enemies[0].x:8.2f}, {enemies[0].y:8.2f}), "
+                  f"pet walk frame changed {flips} times")
+    for loop, runs in ends.items():
+        spread = max(abs(a - b) for run in runs for end, first in zip(run, runs[0]) for a, b in zip(end, first))
+        print(f"{loop}: end positions differ by up to {spread:.2f} px between frame rates")
+
+
+def _old_hud(screen, player, font, small_font):
+    ## the hud as play() drew it straight onto the screen every frame
+    import pygame
+    from hud import draw_health_bar, draw_xp_bar
+    white = (255, 255, 255)
+    screen.blit(font.render("ESC = Menu", True, white), (20, 20))
+    screen.blit(font.render(f"Player: ({int(player.x)}, {int(player.y)})", True, white), (20, 50))
+    backpack_img = pygame.image.load("assets/general png/backpack1.png").convert_alpha()
+    screen.blit(backpack_img, (1200, 600))
+    screen.blit(small_font.render("[I] Inventory", True, white), (1100, 670))
+    draw_health_bar(screen, 1000, 20, player.hp, player.hp_max)
+    draw_xp_bar(screen, 1000, 50, player.xp, player.xp_next, player.level, font)
+    x = 32
+    y = screen.get_height() - 78
+    surf = pygame.surface.Surface((64, 64))
+    surf.set_alpha(150)
+    surf.fill((50, 50, 50))
+    for i in range(5):
+        pygame.draw.rect(screen, white, (x - 4, y - 4, 68, 68), 2)
+        screen.blit(surf, (x-2, y-2))
+        x += 74
+    x = 32
+    for i in range(min(5, len(player.inventory.items))):
+        screen.blit(player.inventory.items[i].image, (x, y))
+        x += 74
+
+
+def bench_hud(frames=600):
+    ## per frame hud cost while the player walks, gets hit now and then and earns xp, old drawing against the cached overlay,
+    ## both are drawn over the same background and compared pixel for pixel
+    import pygame
+    from classes import Inventory
+    from hud import HUD
+    from items import items
+    screen = init_display()
+    font = pygame.font.Font("assets/fonts/path.ttf", 40)
+    small_font = pygame.font.Font("assets/fonts/path.ttf", 20)
+    background = pygame.Surface(screen.get_size())
+    for i in range(0, screen.get_width(), 40):
+        background.fill(((i * 7) % 256, 90, 160), (i, 0, 40, screen.get_height())) ## stripes so blending mistakes show
+
+    class Walker:
+        x, y, hp, hp_max, xp, xp_next, level = 470.0, 200.0, 100, 100, 0, 100, 1
+        inventory = Inventory()
+
+    player = Walker()
+    player.inventory.items = items[:3]
+    hud = HUD(font, small_font)
+    check = screen.copy()
+    times = {"old": 0.0, "hud": 0.0}
+    mismatches = 0
+    for frame in range(frames):
+        player.x += 1.7 ## ~200 px a second at 120 fps
+        if frame % 30 == 0:
+            player.hp = max(1, player.hp - 3)
+        if frame % 120 == 0:
+            player.xp += 25
+            if player.xp >= player.xp_next:
+                player.xp, player.level = 0, player.level + 1 ## like level_up
+        if frame == 300:
+            player.inventory.items = items[:4]
+        for name, surface in (("old", check), ("hud", screen)):
+            surface.blit(background, (0, 0))
+            start = time.perf_counter()
+            if name == "old":
+                _old_hud(surface, player, font, small_font)
+            else:
+                hud.draw(surface, player)
+            times[name] += time.perf_counter() - start
+        mismatches += pygame.image.tobytes(screen, "RGB") != pygame.image.tobytes(check, "RGB")
+    print(f"old {times['old'] / frames * 1000:.3f} ms, hud {times['hud'] / frames * 1000:.3f} ms per frame, "
+          f"{hud.renders} widget redraws in {frames} frames, {mismatches} frames differ")
+
+
+def _old_message(screen, font, message):
+    ## Sign.write_message's text as it was, measured and rendered line by line every frame
+    sw, sh = screen.get_size()
+    lines, current_line = [], ""
+    for word in message.split(" "):
+        test_line = current_line + word + " "
+        if font.size(test_line)[0] < 800 - 20 * 2:
+            current_line = test_line
+        else:
+            lines.append(current_line)
+            current_line = word + " "
+    lines.append(current_line)
+    y_offset = (sh - 400) // 2 + 20
+    for line in lines:
+        text_surface = font.render(line.strip(), True, (255, 255, 255))
+        screen.blit(text_surface, text_surface.get_rect(center=(sw // 2, y_offset + text_surface.get_height() // 2)))
+        y_offset += text_surface.get_height() + 5
+
+
+def bench_text(frames=600):
+    ## font.render against the glyph atlas for the player position text and the text of a sign message held open,
+    ## both drawn onto the same background and compared pixel for pixel
+    import pygame
+    from classes import Sign
+    from ui import text_pieces, get_atlas, layout_text
+    screen = init_display()
+    font = pygame.font.Font("assets/fonts/path.ttf", 40)
+    white = (255, 255, 255)
+    start = time.perf_counter()
+    get_atlas(font, white)
+    print(f"atlas and kerning table built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    check = screen.copy()
+    sign = Sign(0, 0, 0, 0, "The mini boss drops a powerful item, but is very strong! Thank you for saving us from the evil monster!! "
+                            "You have officially beat the game and saved the region")
+    for name, old, new in (
+            ("position text", lambda surface, i: surface.blit(font.render(f"Player: ({470 + i}, {200 + i // 3})", True, white), (20, 50)),
+                              lambda surface, i: surface.blits(text_pieces(font, f"Player: ({470 + i}, {200 + i // 3})", white, (20, 50)))),
+            ("sign message", lambda surface, i: _old_message(surface, font, sign.message),
+                             lambda surface, i: surface.blits([(line, (x + 640, y + 180)) for line, (x, y) in
+                                                               layout_text(font, sign.message, white, 760)]))):
+        times = {"old": 0.0, "new": 0.0}
+        mismatches = 0
+        for i in range(frames):
+            for key, surface, draw in (("old", check, old), ("new", screen, new)):
+                surface.fill((40, 90, 160))
+                start = time.perf_counter()
+                draw(surface, i)
+                times[key] += time.perf_counter() - start
+            mismatches += pygame.image.tobytes(screen, "RGB") != pygame.image.tobytes(check, "RGB")
+        print(f"{name:>14}: font.render {times['old'] / frames * 1000:.3f} ms, atlas {times['new'] / frames * 1000:.3f} ms per frame, "
+              f"{mismatches} frames differ")
+
+
+def bench_menus(seconds=2.0):
+    ## cpu used by the main menu while nobody touches it, the old loop redrew as fast as it could,
+    ## then a few key presses are sent to check the menu still answers them, and an animating screen is capped
+    import pygame
+    from main import main_menu
+    from options import options_screen
+    from ui import draw_title, DARK, WHITE, GREEN
+    screen = init_display()
+    font = pygame.font.Font("assets/fonts/path.ttf", 40)
+    options = ["Play", "Options", "Character Select", "Pick Save File", "Quit"]
+
+    flips = [0]
+    flip = pygame.display.flip
+    def counted_flip():
+        flips[0] += 1
+        flip()
+    pygame.display.flip = counted_flip
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    while time.perf_counter() - wall < seconds: ## the old main_menu loop
+        pygame.event.get()
+        screen.fill(DARK)
+        draw_title(screen, font, "Main Menu")
+        for i, name in enumerate(options):
+            screen.blit(font.render(name, True, GREEN if i == 0 else WHITE), (520, 200 + i*90))
+        pygame.display.flip()
+    old_cpu, old_flips = time.process_time() - cpu, flips[0]
+
+    flips[0] = 0
+    pygame.time.set_timer(pygame.QUIT, int(seconds * 1000), 1) ## closes the menu after the same time
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = main_menu(screen, font)
+    new_cpu, new_wall = time.process_time() - cpu, time.perf_counter() - wall
+    print(f"old menu: {old_cpu / seconds * 100:5.1f}% cpu, {old_flips} frames drawn in {seconds:.0f} s")
+    print(f"new menu: {new_cpu / new_wall * 100:5.1f}% cpu, {flips[0]} frames drawn in {new_wall:.1f} s, closed with {result!r}")
+
+    for key in (pygame.K_s, pygame.K_s, pygame.K_SPACE):
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+    flips[0] = 0
+    print(f"S, S, SPACE in the main menu returns {main_menu(screen, font)!r} after {flips[0]} frames")
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_ESCAPE))
+    settings = {"gameplay": {"difficulty": "Easy"}, "video": {"fullscreen": False}, "audio": {"volume": "Low", "mute": False}}
+    print(f"ESC in options returns {options_screen(screen, font, settings, None)!r}")
+    pygame.display.flip = flip
+
+    ## a screen that animates for half a second, run_screen should draw at its fps cap then and go back to sleeping after
+    from ui import run_screen, Leave
+    drawn = []
+    wall = time.perf_counter()
+    end = wall + 0.5
+    pygame.time.set_timer(pygame.QUIT, 1000, 1)
+    cpu = time.process_time()
+    run_screen(lambda: drawn.append(time.perf_counter()), lambda e: Leave() if e.type == pygame.QUIT else None,
+               animating=lambda: time.perf_counter() < end, fps=30)
+    new_wall, new_cpu = time.perf_counter() - wall, time.process_time() - cpu
+    moving = sum(t < end for t in drawn)
+    print(f"animating 0.5 s at fps=30: {moving} frames drawn, then {len(drawn) - moving} in the next "
+          f"{new_wall - 0.5:.1f} s idle, {new_cpu / new_wall * 100:.1f}% cpu overall")
+
+
+def bench_thumbnails():
+    ## drawing a character select page the old way (decode and scale all 8 every frame) against the tile cache,
+    ## then paging through every character with the worker prefetching the pages around the one shown
+    import pygame
+    from thumbnails import ThumbnailCache
+    screen = init_display()
+    size = (192, 192)
+    folders = {g: sorted(os.path.join("assets", "characters", g, f) for f in os.listdir(os.path.join("assets", "characters", g))
+                         if f.lower().endswith(".png")) for g in ("Male", "Female")}
+    page = folders["Male"][:8]
+
+    start = time.perf_counter()
+    for _ in range(20):
+        old = [pygame.transform.scale(pygame.image.load(path).convert_alpha(), size) for path in page]
+        screen.blits([(img, (i * 10, 0)) for i, img in enumerate(old)])
+    old_ms = (time.perf_counter() - start) / 20 * 1000
+
+    cache = ThumbnailCache()
+    start = time.perf_counter()
+    tiles = [cache.get(path, size) for path in page]
+    cold_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(20):
+        screen.blits([(cache.get(path, size), (i * 10, 0)) for i, path in enumerate(page)])
+    warm_ms = (time.perf_counter() - start) / 20 * 1000
+    same = all(pygame.image.tobytes(a, "RGBA") == pygame.image.tobytes(b, "RGBA") for a, b in zip(old, tiles))
+    print(f"one page: old {old_ms:.2f} ms every frame, cache {cold_ms:.2f} ms the first time and {warm_ms:.3f} ms after, "
+          f"tiles {'match' if same else 'DIFFER from'} the old ones")
+
+    ## every page of both folders, the player looks at each page for 100 ms like someone holding D
+    waits, loads_before = [], cache.loads
+    for gender, other in (("Male", "Female"), ("Female", "Male")):
+        paths = folders[gender]
+        for first in range(0, len(paths), 8):
+            start = time.perf_counter()
+            for path in paths[first:first + 8]:
+                cache.get(path, size)
+            waits.append((time.perf_counter() - start) * 1000)
+            cache.prefetch(paths[first + 8:first + 16] + paths[max(0, first - 8):first] + folders[other][:8], size)
+            time.sleep(0.1)
+    tile_bytes = sum(entry[0].get_pitch() * entry[0].get_height() for entry in cache.tiles.values())
+    print(f"paging through {sum(map(len, folders.values()))} characters: page shown in {sum(waits) / len(waits):.2f} ms on average, "
+          f"{max(waits):.2f} ms at worst, {cache.loads - loads_before} files decoded, "
+          f"{len(cache.tiles)} tiles kept ({tile_bytes / 1048576:.1f} MB, limit {cache.max_tiles})")
+
+    ## a corrupt file in the middle of a prefetch is skipped, the worker carries on with the rest
+    import tempfile
+    bad = os.path.join(tempfile.mkdtemp(), "broken.png")
+    with open(bad, "wb") as f:
+        f.write(b"not a png")
+    cache = ThumbnailCache()
+    cache.prefetch([bad] + page[:2], size)
+    waited = time.perf_counter()
+    while not cache.idle() and time.perf_counter() - waited < 5:
+        time.sleep(0.01)
+    print(f"prefetch with a corrupt file: worker alive {cache.worker.is_alive()}, idle {cache.idle()}, "
+          f"{sum(cache.ready(p, size) for p in page[:2])}/2 good tiles loaded")
+
+
+def bench_assets():
+    ## what the game loads up to the first frame, how much of it was asked for more than once,
+    ## then every pet frame pushed through a small budget to show the cache staying under it
+    import pygame
+    from assets import assets
+    import game ## the items are made here, before the window like when main imports it
+    init_display()
+    pygame.mixer.init()
+    from classes import PetRoster
+    game.make_enemies()
+    hud = game.HUD(assets.font(40), assets.font(20))
+    game.sounds.preload()
+    stats = assets.stats()
+    print(f"game start: {stats['assets']} assets ({stats['bytes'] / 1048576:.1f} MB of images, "
+          f"{stats['pinned_bytes'] / 1048576:.1f} MB of fonts and sounds), {stats['misses']} loads")
+    display = pygame.display.get_surface().convert_alpha().get_bitsize(), pygame.display.get_surface().convert_alpha().get_masks()
+    drawn = all((item.image.get_bitsize(), item.image.get_masks()) == display for item in game.items)
+    print(f"items draw the display format copy: {drawn}")
+    hits = assets.hits
+    hud = game.HUD(assets.font(40), assets.font(20)) ## back to the menu and into the game again
+    print(f"second game start: {assets.stats()['misses'] - stats['misses']} loads, {assets.hits - hits} requests served from the cache")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        assets.image(os.path.join("assets", "general png", "backpack1.png"))
+    hit_us = (time.perf_counter() - start) / 100 * 1e6
+    start = time.perf_counter()
+    for _ in range(20):
+        pygame.image.load(os.path.join("assets", "general png", "backpack1.png")).convert_alpha()
+    load_us = (time.perf_counter() - start) / 20 * 1e6
+    print(f"backpack: {load_us:.0f} us to load from disk, {hit_us:.1f} us from the cache")
+
+    assets.set_budget(4)
+    evictions = assets.evictions
+    roster = PetRoster()
+    peak = 0
+    for name in roster.species():
+        for i in range(8):
+            assets.image(os.path.join(roster.folder, name, f"frame_{i}.png"), roster.size) ## straight from the cache, no clip holding them
+        peak = max(peak, assets.bytes)
+    stats = assets.stats()
+    print(f"{len(roster.species())} pets through a 4 MB budget: {assets.evictions - evictions} evicted, "
+          f"{len(assets.entries)} images kept ({stats['bytes'] / 1048576:.2f} MB), peak {peak / 1048576:.2f} MB")
+    import ui
+    ui.get_atlas(hud.font, ui.WHITE)
+    atlases = len(ui.atlases)
+    ui.get_atlas(assets.font(40), ui.WHITE)
+    print(f"fonts after the squeeze: same Font {assets.font(40) is hud.font}, glyph atlases {atlases} -> {len(ui.atlases)}")
+
+
+BENCHES = {
+    "memory": bench_memory,
+    "collisions": bench_collisions,
+    "animation": bench_animation,
+    "tiles": bench_tiles,
+    "scroll": bench_scroll,
+    "zones": bench_zones,
+    "sprites": bench_sprites,
+    "swarm": bench_swarm,
+    "spatial": bench_spatial,
+    "projectiles": bench_projectiles,
+    "audio": bench_audio,
+    "pets": bench_pets,
+    "flow": bench_flow,
+    "ai": bench_ai,
+    "entities": bench_entities,
+    "timestep": bench_timestep,
+    "hud": bench_hud,
+    "text": bench_text,
+    "menus": bench_menus,
+    "thumbnails": bench_thumbnails,
+    "assets": bench_assets,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "_memory":
+        _memory_case(sys.argv[2])
+    elif len(sys.argv) > 1 and sys.argv[1] in BENCHES:
+        BENCHES[sys.argv[1]]()
+    else:
+        print("usage: python src/bench.py [" + " | ".join(BENCHES) + "]")
@@ -1,13 +1,27 @@
+import os
 import pygame
 import math
 import random
+from collections import OrderedDict
 from settings import ap
+from sprites import grid_clip, file_clip
+from projectiles import ProjectilePool
+from audio import sounds
+from ui import layout_text
+from assets import assets
 global settings
 pygame.init()
 
+ENEMY_REACH = 80 ## px from an enemy's x, y to the far edge of its rect, the boss rect is 140x160
+PET_FRAME_TIME = 1 / 6 ## seconds each pet walk frame shows, what 10 frames at 60 fps used to be
+
 
 
 class Character:
+    ## slots instead of a __dict__ per character, a map full of enemies is mostly these objects
+    __slots__ = ("name", "x", "y", "hp_max", "hp", "attack", "defence", "speed",
+                 "direction", "frames", "anim_time", "anim_frame", "pet")
+
     def __init__(self, name, x, y, hp_max, attack, defence, speed, spritesheet_path):
         self.name = name
         self.x = float(x)
@@ -29,17 +43,9 @@ class Character:
         self.pet = None ## the pet is stored here as it is defined seperately for the player and the enemy if it has one
 
     def _load_frames(self, path):
-        ## expects 4 rows (down, left, right, up) and 3 cols
-        sheet = pygame.image.load(path).convert_alpha()
-        frames = {"down": [], "left": [], "right": [], "up": []}
-        rows = ["down", "left", "right", "up"]
-
-        for r, d in enumerate(rows): ## loops through the rows of the spreadsheet
-            for c in range(3): ## each row has 3 frames - 0 to 2
-                frame = sheet.subsurface(pygame.Rect(c*32, r*32, 32, 32)) ## the spritesheet is in 32x32 for every character
-                frame = pygame.transform.scale(frame, (64, 64)) ## enlarge the frame to 64x64 for better visibility
-                frames[d].append(frame)
-        return frames
+        ## expects 4 rows (down, left, right, up) and 3 cols, the frames are shared by every character using the same sheet
+        rows = grid_clip(path, 32, 32, 4, 3, (64, 64)) ## the spritesheet is in 32x32 for every character, enlarged to 64x64 for better visibility
+        return dict(zip(["down", "left", "right", "up"], rows))
     
 
 
@@ -72,25 +78,25 @@ class Character:
 
 
 class Player(Character):
+    __slots__ = ("attacking", "attack_frame", "attack_timer", "attack_frames", "last_portal", "teleport_cooldown",
+                 "projectiles", "inventory", "hand", "gold", "level", "xp", "xp_next")
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs) ## uses **kwargs to allow for more flexible arguments, passing as a dict
 
         self.attacking = False
         self.attack_frame = 0  ## sets the attacking frames to 0 - the neutral position
         self.attack_timer = 0
-        self.attack_frames = []
+        self.attack_frames = file_clip([f"assets/weapons/sprites/sword_{i}.png" for i in range(5)])
+        ## every time the player attacks, it will loop through these frames for the animation
 
         self.last_portal = None
         self.teleport_cooldown = 0 ## neutral cooldown for teleporting, so the player doesn't immediately teleport back after going through a portal
 
 
-        self.projectiles = [] ## empty array for the projectiles on the map
+        self.projectiles = ProjectilePool() ## every projectile on the map, kept in arrays that are reused
         
 
-        for i in range(5):
-            img = pygame.image.load(f"assets/weapons/sprites/sword_{i}.png").convert_alpha()
-            self.attack_frames.append(img)  ## every time the player attacks, it will loop through these frames for the animation
-
         self.inventory = Inventory() ## makes and empy inventory for the player to store items in
         self.hand = self.inventory.items[0] if self.inventory.items else None ## if there is an item in there somehow, it is held
 
@@ -181,10 +187,10 @@ class Player(Character):
         final_damage = damage * (reduction)
         self.hp = max(0, self.hp - final_damage)
 
-    def melee(self, keys, controls, enemies=None):
+    def melee(self, keys, controls, enemies=None, neighbours=None):
         
         if keys[controls["attack"]] and not self.attacking and self.hand and self.hand.item_type == "weapon" and self.hand.range == "melee":
-            pygame.mixer.Sound(ap("audio", "X-scissor.mp3")).play() 
+            sounds.play("X-Scissor.mp3") ## already decoded, plays on a free effect channel
             ## plays sword swing sound when attacking ## ensures it only enters if holding a melee weapon
             self.attacking = True
             self.attack_frame = 0
@@ -194,6 +200,8 @@ class Player(Character):
             radius = 32  ## melee range in pixels
             hit_rect = pygame.Rect(self.x, self.y, radius, radius)
             
+            if neighbours is not None:
+                enemies = neighbours.query_rect(hit_rect, ENEMY_REACH) ## only enemies close enough to be touched
             if enemies:
                 for enemy in enemies:
                     if hit_rect.colliderect(enemy.rect()):
@@ -206,52 +214,23 @@ class Player(Character):
             self.attack_frame = 0
             self.attack_timer = 0
 
-            projectile = {
-                "rect": pygame.Rect(self.x, self.y, 10, 10),
-                "direction": self.direction,
-                "speed": 600  # pixels per second
-            }
-            ## creates a projectile with a rect for collision detection with enemies and adds it to the players projectiles
-            self.projectiles.append(projectile)
-    def update_projectiles(self, dt, enemies):
-        for projectile in self.projectiles[:]:  ## copy list to safely remove
-        
-            move_amount = projectile["speed"] * dt
-
-            if projectile["direction"] == "up":
-                projectile["rect"].y -= move_amount
-            elif projectile["direction"] == "down":
-                projectile["rect"].y += move_amount
-            elif projectile["direction"] == "left":
-                projectile["rect"].x -= move_amount
-            elif projectile["direction"] == "right":
-                projectile["rect"].x += move_amount
-
-        ## Remove if off screen
-            if (projectile["rect"].x < 0 or
-                projectile["rect"].x > 10000 or
-                projectile["rect"].y < 0 or
-                projectile["rect"].y > 20000):
-                self.projectiles.remove(projectile)
-                continue
+            self.projectiles.spawn(self.x, self.y, self.direction, 600) ## 600 pixels per second
+            ## adds a 10x10 projectile at the player flying the way they face
+
+    def update_projectiles(self, dt, enemies, neighbours=None, collides_array=None):
+        ## moves every projectile at once, the ones that hit an enemy or a wall on the way are removed
+        if neighbours is not None and len(self.projectiles):
+            near = {}
+            for rect in self.projectiles.swept_rects(dt):
+                for enemy in neighbours.query_rect(rect, ENEMY_REACH): ## only enemies near a shot's path
+                    near[id(enemy)] = enemy
+            enemies = list(near.values())
+        for enemy in self.projectiles.update(dt, enemies, collides_array):
+            enemy.take_damage(self)
+
+    def draw_projectiles(self, screen, cam_x, cam_y, lag=0.0):
+        self.projectiles.draw(screen, cam_x, cam_y, lag) ## brown 10x10 squares with a black border
 
-            ## Collision check with enemies
-            if enemies:
-                for enemy in enemies:
-                    if projectile["rect"].colliderect(enemy.rect()):
-                        enemy.take_damage(self)
-                        self.projectiles.remove(projectile)
-                        break
-    def draw_projectiles(self, screen, cam_x, cam_y):
-        for projectile in self.projectiles:
-            draw_rect = pygame.Rect(
-                projectile["rect"].x - cam_x,
-                projectile["rect"].y - cam_y,
-                projectile["rect"].width,
-                projectile["rect"].height
-            ) ## centers the projectile rect on the projectile and adjusts accordinglt for camera
-            pygame.draw.rect(screen, (139, 69, 19), draw_rect) ##brown rectangle
-            pygame.draw.rect(screen, (0,0,0), draw_rect, 1) ## simple black border
     def update_attack(self, dt):
 
         if self.attacking:
@@ -300,6 +279,8 @@ class Player(Character):
                 self.inventory.drop_item(self.hand)
                 ##simple method for equipping armour, adds defence and stacks onto past armour
 class Enemy(Character):
+    __slots__ = ("tracking", "range", "attack_damage", "attack_cooldown", "attack_timer")
+
     def __init__(self, *args):
         super().__init__(*args)
         self.tracking = False
@@ -344,7 +325,7 @@ class Enemy(Character):
             pygame.draw.rect(screen, (0, 255, 0), (x, y, fill_width, bar_height))    ## green fill
             pygame.draw.rect(screen, (255, 255, 255), (x, y, bar_width, bar_height), 1)  ## outline
 
-    def track(self, player, dt, enemies,collides_fn, tracking_range=400, min_range=50):
+    def track(self, player, dt, enemies,collides_fn, tracking_range=400, min_range=50, neighbours=None, flow=None):
         ##Basic enemy tracking ai
         dx = player.x - self.x
         dy = player.y - self.y
@@ -360,9 +341,15 @@ class Enemy(Character):
 
         nx = dx / dist
         ny = dy / dist ## normalized vectors for movement
+        if flow is not None:
+            step = flow.direction(self.x, self.y)
+            if step is not None:
+                nx, ny = step ## follows the way around walls instead of walking straight into them
 
         ## seperation from other enemies to prevent stacking
         sep_x, sep_y = 0.0, 0.0
+        if neighbours is not None:
+            enemies = neighbours.query_radius(self.x, self.y, 90) ## the only ones close enough to push
         for other in enemies:
             if other is self:
                 continue
@@ -403,8 +390,12 @@ class Enemy(Character):
             self.y = old_y
             self.update_anim(dt, True)
             ## can move horizontally and vertically separately to prevent getting stuck on corners
+        if neighbours is not None:
+            neighbours.update(self) ## keeps the hash right for the enemies tracked after this one
 
 class Boss(Enemy):
+    __slots__ = ("boss_index",)
+
     def __init__(self, name, x, y, hp_max, attack, defence, speed, spritesheet_path, boss_index):
         super().__init__(name, x, y, hp_max, attack, defence, speed, spritesheet_path)
 
@@ -414,24 +405,12 @@ class Boss(Enemy):
         self.anim_frame = 0
 
     def load_boss_frames(self, path):
-        sheet = pygame.image.load(path).convert_alpha()
-        frames = []
-
         frame_size = 96  # change if needed
 
         row = self.boss_index  # which boss row to use
+        size = (120, 120) if self.name == "Mini Boss" else (150, 150)  # bosses bigger
 
-        for col in range(3):  # 3 frames
-            frame = sheet.subsurface(
-                pygame.Rect(col * frame_size, row * frame_size, frame_size, frame_size)
-            )
-            if self.name == "Mini Boss":
-                frame = pygame.transform.scale(frame, (120, 120))  # bosses bigger
-            else:
-                frame = pygame.transform.scale(frame, (150, 150))  # bosses bigger
-            frames.append(frame)
-
-        return frames
+        return grid_clip(path, frame_size, frame_size, [row], 3, size)[0]  # 3 frames
     def rect(self):
         width = 140
         height = 160
@@ -455,50 +434,100 @@ class Boss(Enemy):
              int(self.y - img.get_height()//2 - cam_y))
         )
 class Item:
+    ## one per kind of item in items.json, shared by every copy of it on the ground or in an inventory,
+    ## where a copy is lying is kept in an ItemDrop
+    __slots__ = ("name", "item_type", "sub_type", "effect", "value", "image_path")
+
     def __init__(self, name, item_type, sub_type, effect, value, image_path):
         self.name = name
         self.item_type = item_type
         self.sub_type = sub_type
         self.effect = effect
         self.value = value ## when items are defined in the json, all of these attributes are passed in
-        self.image = pygame.image.load(image_path)
-        self.image = pygame.transform.scale(self.image, (64, 64)) ## all items are scaled to 64x64 for consistency and visibility
+        self.image_path = image_path
+        assets.image(image_path, (64, 64)) ## loaded now, items are made before the window so it is converted on first use
+
+    @property
+    def image(self):
+        ## looked up every time instead of kept, so everything draws the display format copy once there is a window
+        return assets.image(self.image_path, (64, 64)) ## all items are scaled to 64x64 for consistency and visibility, shared by items with the same picture
 
     def draw(self, screen, x, y, cam_x, cam_y):
         screen.blit(self.image, (x - cam_x, y - cam_y)) ## simple drawing for items on the ground
 
-    def pickup(self, player, location, items, locations, keys, controls): ##location is the items location, locations stores all places they spawn
-        region = pygame.Rect(location[0], location[1] , 64, 64)
+
+class ItemDrop:
+    ## an item lying on the map, only which item it is and where, the name, stats and image stay on the Item
+    __slots__ = ("item", "x", "y")
+
+    def __init__(self, item, x, y):
+        self.item = item
+        self.x = x
+        self.y = y
+
+    def draw(self, screen, cam_x, cam_y):
+        self.item.draw(screen, self.x, self.y, cam_x, cam_y)
+
+    def pickup(self, player, keys, controls):
+        ## true when the player picked it up, the caller takes it off the ground
         if keys[controls["use"]]:
+            region = pygame.Rect(self.x, self.y, 64, 64)
             if region.collidepoint(player.x, player.y): ## checks if player is over the item
-                if  player.inventory.add_item(self):
-                    items.remove(self)
-                    locations.remove(location)
-                    return items, locations
-        return items, locations ## if an item is picked up the items and locations arrays are updated
+                return player.inventory.add_item(self.item)
+        return False
 
 class Weapon(Item):
+    __slots__ = ("power", "range")
+
     def __init__(self, name, sub_type, effect, value, power, range_weapon, image_path):
         super().__init__(name, "weapon", sub_type, effect, value, image_path)
         self.power = power
         self.range = range_weapon
 
 class Armour(Item):
+    __slots__ = ("defence",)
+
     def __init__(self, name, sub_type, effect, value, defence, image_path):
         super().__init__(name, "armour", sub_type, effect, value, image_path)
         self.defence = defence
 
 class Consumable(Item):
+    __slots__ = ("strength",)
+
     def __init__(self, name, sub_type, effect, value, strength, image_path):
         super().__init__(name, "consumable", sub_type, effect, value, image_path)
         self.strength = strength
 
 class QuestItem(Item):
+    __slots__ = ("quest",)
+
     def __init__(self, name, sub_type, effect, quest, image_path):
         super().__init__(name, "quest_item", sub_type, effect, 0, image_path)
         self.quest = quest
 ## all items have one or more extra attributes depending on the type
 
+class PetRoster:
+    ## every pet species in the pets folder, listed without decoding anything,
+    ## a species' frames are only loaded the first time it is used and are then shared through the clip registry
+    def __init__(self, folder=ap("pets", "pokemon_slices"), size=(64, 64)):
+        self.folder = folder
+        self.size = size ## frames are scaled to this once when loaded instead of every draw
+        self._species = None
+
+    def species(self):
+        ## names only, nothing is decoded
+        if self._species is None:
+            self._species = sorted(name for name in os.listdir(self.folder)
+                                   if os.path.isdir(os.path.join(self.folder, name)))
+        return self._species
+
+    def frames(self, name):
+        path = os.path.join(self.folder, name)
+        return file_clip([os.path.join(path, f"frame_{i}.png") for i in range(8)], self.size) ## each pokemon folder has 8 frames, 4 directions
+
+
+pets = PetRoster() ## shared so every pet of the same species uses the same frames
+
 class Pet:
     def __init__(self, player, name):
         self.x, self.y = self.update_position(player)
@@ -513,13 +542,7 @@ class Pet:
                              ##is defined here and can be changed by different pets
 
     def load_frames(self, name):
-        path = f"assets/pets/pokemon_slices/{name}" ## used a set asset folder full of downloaded sprites
-        frames = []
-
-
-        for i in range(8): ## each pokemon folder has 8 frames, 4 directions
-            img = pygame.image.load(f"{path}/frame_{i}.png").convert_alpha()
-            frames.append(img)
+        frames = pets.frames(name) ## used a set asset folder full of downloaded sprites, already scaled to 64x64
         return frames, (frames[0], frames[2]), (frames[1], frames[3]), (frames[4], frames[6]), (frames[5], frames[7]) 
     ## in 2x4 grid going across it goes, up  left up left down right down right 
 
@@ -554,16 +577,16 @@ class Pet:
         elif self.direction == "right":
             frames = self.right_frames
 
-        img = frames[self.anim_frame // 10 % 2]
-        img = pygame.transform.scale(img, (64, 64))
+        img = frames[self.anim_frame]
         screen.blit(img, (int(self.x - cam_x - img.get_width()//2), int(self.y - cam_y - img.get_height()//2))) ## same way all other sprites are displayed
 
-    def update_pet(self, player, screen, cam_x, cam_y):
-        
+    def update(self, player, dt):
         self.x, self.y = self.update_position(player)
-        self.draw(screen, cam_x, cam_y)
-        self.anim_frame+=1
-        ##grouped update method
+        self.anim_time += dt ## by time like the player, so the walk cycle is the same speed at any frame rate
+        if self.anim_time >= PET_FRAME_TIME:
+            self.anim_time -= PET_FRAME_TIME
+            self.anim_frame = (self.anim_frame + 1) % 2 ## 2 frames per direction
+        ##grouped update method, run every simulation step, drawing is left to draw
 
 class Region:
     def __init__(self, x1, x2, y1, y2):
@@ -574,6 +597,12 @@ class Region:
         return x1 <= x <= x2 and y1 <= y <= y2
     ## defines the basic region class which is applied for anything interactable
 
+    def distance_to(self, x, y):
+        x1, x2, y1, y2 = self.rect
+        dx = max(x1 - x, 0, x - x2)
+        dy = max(y1 - y, 0, y - y2)
+        return math.hypot(dx, dy) ## 0 when inside, otherwise distance to the nearest edge
+
 
 class Portal(Region):
     def __init__(self, portal_id, x1, x2, y1, y2, target_x, target_y, key):
@@ -608,34 +637,16 @@ class Sign(Region):
         ## Border
         pygame.draw.rect(screen, (255, 255, 255), (box_x, box_y, box_width, box_height), 3)
 
-        ## Warping text to fit in the box
-        words = self.message.split(" ")
-        lines = []
-        current_line = ""
-
-        for word in words:
-            test_line = current_line + word + " "
-            if font.size(test_line)[0] < box_width - padding * 2:
-                current_line = test_line
-            else:
-                lines.append(current_line)
-                current_line = word + " "
-
-        lines.append(current_line)
-
-        ## Render lines centered
-        y_offset = box_y + padding
-        for line in lines:
-            text_surface = font.render(line.strip(), True, (255, 255, 255))
-            text_rect = text_surface.get_rect(center=(sw // 2, y_offset + text_surface.get_height() // 2))
-            screen.blit(text_surface, text_rect)
-            y_offset += text_surface.get_height() + 5
+        ## Warping text to fit in the box, laid out once per message and then only blitted
+        pieces = layout_text(font, self.message, (255, 255, 255), box_width - padding * 2)
+        cx, top = sw // 2, box_y + padding
+        screen.blits([(glyph, (x + cx, y + top)) for glyph, (x, y) in pieces], doreturn=False)
 
 class NPC(Sign):
     def __init__(self, x1, x2, y1, y2, message, image_path, name):
         super().__init__(x1, x2, y1, y2, message)
         self.name = name
-        self.image = pygame.image.load(image_path).convert_alpha() ## NPC is a sublass of sign as they only differ in that they have a sprite
+        self.image = assets.image(image_path) ## NPC is a sublass of sign as they only differ in that they have a sprite
 
     def draw(self, screen, cam_x, cam_y):
         screen.blit(self.image, (self.rect[0] - cam_x, self.rect[2] - cam_y)) ## draws the npc sprite at its location
@@ -3,6 +3,15 @@ import random
 import pygame
 
 from world import World
+from zones import EnemyZones
+from swarm import EnemySwarm, SwarmEnemy
+from spatial import SpatialHash
+from audio import sounds
+from pathfinding import FlowField
+from scheduler import AIScheduler
+from timestep import FixedStep
+from hud import HUD
+from assets import assets
 from classes import *
 from settings import ap
 from save_system import write_save, load_save
@@ -11,25 +20,20 @@ from items import items
 
 
 WHITE = (255,255,255)
-GREEN = (0,255,0)
-PURPLE = (255,0,255) ## some basic colours for hp and xp bars
-
-def draw_health_bar(screen, x, y, hp, hp_max):
-    w, h = 250, 28
-    fill = int((hp / hp_max) * w) if hp_max > 0 else 0
-    pygame.draw.rect(screen, GREEN, (x, y, fill, h))
-    pygame.draw.rect(screen, WHITE, (x, y, w, h), 2) ## draws the players hp bar scalling the bar to the players hp
-
-def draw_xp_bar(screen, x, y, xp, xp_next, level, font):
-    w, h = 250, 15
-    fill = int((xp / xp_next) * w) if xp_next > 0 else 0
-    pygame.draw.rect(screen, PURPLE, (x, y, fill, h))
-    pygame.draw.rect(screen, WHITE, (x, y, w, h), 2)
-    ## write level and xp text
-    text = font.render(f"Level {level} - XP: {xp}/{xp_next}", True, WHITE)
-    ## scale down to fit below the bar
-    text = pygame.transform.scale(text, (text.get_width() * 0.3, text.get_height() * 0.3))
-    screen.blit(text, (x, y + 15))
+
+TELEPORT_COOLDOWN = 0.8 ## seconds before another portal can be used, about the 100 frames it used to be at 120 fps
+SUPPORT_SPAWN_RATE = 1.2 ## support enemies a second the boss calls in on average, was a 1% chance every frame at 120 fps
+
+worlds = {} ## loaded worlds by map path, kept between play sessions so going back to the menu doesnt reload the map
+
+def get_world(path, settings):
+    world = worlds.get(path)
+    if world is None:
+        world = World(path, cache_mb=settings["video"].get("chunk_cache_mb", 64),
+                      solid_layers=settings["gameplay"].get("solid_tile_layers", []), ## extra tile layers that count as walls, opt in, collision objects always are
+                      scroll_reuse=settings["video"].get("scroll_reuse", False))
+        worlds[path] = world
+    return world
 
     
 
@@ -67,7 +71,7 @@ def make_player(settings):
     return p
 
 
-def make_enemies():
+def make_enemies(swarm=None):
     enemy_dir = ap("characters", "Enemy")
     files = [os.path.join(enemy_dir, f)
              for f in os.listdir(enemy_dir)
@@ -108,7 +112,10 @@ def make_enemies():
     # Create Enemy objects
     for i, (x, y) in enumerate(positions):
         sprite = files[i % len(files)]
-        enemy = Enemy(f"Enemy {i+1}", x, y, 300, 50, 2, 200, sprite)
+        if swarm is not None:
+            enemy = SwarmEnemy(swarm, f"Enemy {i+1}", x, y, 300, 50, 2, 200, sprite) ## state kept in the swarm's arrays
+        else:
+            enemy = Enemy(f"Enemy {i+1}", x, y, 300, 50, 2, 200, sprite)
         enemies.append(enemy)
 
     return enemies
@@ -158,12 +165,13 @@ def open_inventory(player, screen, font, keys):
 
 
 
-def handle_portals(player, portals, keys, controls):
+def handle_portals(player, portals, keys, controls, dt):
 
     ## Reduce cooldown
     if player.teleport_cooldown > 0:
-        player.teleport_cooldown -= 1
+        player.teleport_cooldown = max(0, player.teleport_cooldown - dt)
 
+    teleported = False
     for portal in portals:
         if (
             portal.contains(player.x, player.y)
@@ -174,66 +182,29 @@ def handle_portals(player, portals, keys, controls):
         ):
             player.x, player.y = portal.target
             player.last_portal = portal.id
-            player.teleport_cooldown = 100 ## resets cooldown to prevent immediate re-teleporting, can be adjusted for better feel
+            player.teleport_cooldown = TELEPORT_COOLDOWN ## resets cooldown to prevent immediate re-teleporting, can be adjusted for better feel
+            teleported = True
             break
 
     ## Reset lock when outside all portals
     if not any(portal.contains(player.x, player.y) for portal in portals):
         player.last_portal = None
+    return teleported ## lets the game loop know the camera is about to jump
 
-def draw_hotbar(player, screen):
-    x = 32
-    y = screen.get_height() - 78
-    surf = pygame.surface.Surface((64, 64))
-    surf.set_alpha(150)
-    surf.fill((50, 50, 50))
-    for i in range(5):
-        pygame.draw.rect(screen, WHITE, (x - 4, y - 4, 68, 68), 2) ## draws hotbar slots
-        
-        screen.blit(surf, (x-2, y-2)) ## fills hotbar slots with semi-transparent background
-
-        x += 74
-    x = 32
-    for i in range (min(5,len(player.inventory.items))):
-        screen.blit(player.inventory.items[i].image, (x, y))
-        x+=74
-
-
-
-def draw_items_ground(player, screen, ground_items, locations, cam_x, cam_y):
-    i = 0
-    while i < len(ground_items): ## used while over for loop because we might remove items while iterating
-
-        if ground_items[i] in player.inventory.items:
-            ground_items.pop(i)
-            locations.pop(i) ## removes items from arrays if the player has them
-        else:
-            x, y = locations[i]
-            ground_items[i].draw(screen, x, y, cam_x, cam_y)
-            i += 1 ## increments if an item isnt removed, otherwise the next item will be skipped
-
-    return ground_items, locations 
+def draw_items_ground(player, screen, ground_items, cam_x, cam_y):
+    ground_items[:] = [drop for drop in ground_items if drop.item not in player.inventory.items] ## removes items the player already has
+    for drop in ground_items:
+        drop.draw(screen, cam_x, cam_y)
+    return ground_items
 
 
 
 def play(screen, clock, font, settings, controls):
-    pygame.mixer.init()
-    volume = settings["audio"]["volume"]
-    noise = 33
-    if volume == "Low":
-        noise = 0.33
-    elif volume == "Medium":
-        noise = 0.66
-    elif volume == "High":
-        noise = 1.0
-    if settings["audio"]["mute"]:
-        noise = 0    
-
-    pygame.mixer.music.set_volume(noise)
-    pygame.mixer.music.load(ap("audio", "pallet_town.mp3"))
-    pygame.mixer.music.play(-1) ## starts background music on loop
-
-    world = World(ap("maps", "bananas_map.tmx")) ## loads the map from assets/maps, using ap function
+    sounds.preload() ## decodes the sound effects once, later calls do nothing
+    sounds.apply_settings(settings["audio"])
+    sounds.play_music("pallet_town.mp3") ## starts background music on loop
+
+    world = get_world(ap("maps", "bananas_map.tmx"), settings) ## loads the map from assets/maps, using ap function
     mini_boss_defeated = False
     boss_defeated = False
     mini_made, boss_made = False, False ## starting conditions for bosses
@@ -245,32 +216,35 @@ def play(screen, clock, font, settings, controls):
     else:
         player = make_player(settings)
         items_to_remove = player.from_dict(player_data)
-
         
     pet = Pet(player, "Mew")    
     player.pet = pet    ## hardcodes what pet the player has, can be expanded to have a choice
 
 
-    enemies = make_enemies() 
-    
     tracking_range = settings["gameplay"].get("enemy_tracking_range", 400)
     min_range = settings["gameplay"].get("enemy_min_range", 50) ## parts of enemy settings is loaded, 400 and 50 for backups if there is an error
+    wake_radius = settings["gameplay"].get("enemy_wake_radius", 1000) ## enemy zones further than this from the player sleep
+
+    swarm = EnemySwarm() if settings["gameplay"].get("enemy_swarm", False) else None ## opt in, tracks enemies in one batched numpy step
+    zones = EnemyZones(world.enemy_zones, make_enemies(swarm), wake_radius)
+    neighbours = SpatialHash() ## 128 px cells, bigger than the 90 px separation radius
+    pathfinding = settings["gameplay"].get("enemy_pathfinding", True)
+    flow = FlowField(world) if pathfinding else None ## way to the player around walls, shared by every enemy
+    ai = AIScheduler(budget_ms=settings["gameplay"].get("ai_budget_ms", 2.0)) ## far enemies think less often, capped per frame
 
     cam_x, cam_y = 0, 0
-    small_font = pygame.font.Font("assets/fonts/path.ttf", 20) ## smaller font for inventory text and other small text on screen
+    small_font = assets.font(20) ## smaller font for inventory text and other small text on screen
+    hud = HUD(font, small_font)
 
-    item_spawns = [(380, 150), (1750, 80), (2300, 1080), (1396, 3215), (4250, 750)]
-    ground_items = [items[0], items[4], items[2], items[10], items[1]] ## arrays for defining item spawns and what items thet are
+    ground_items = [ItemDrop(items[0], 380, 150), ItemDrop(items[4], 1750, 80), ItemDrop(items[2], 2300, 1080),
+                    ItemDrop(items[10], 1396, 3215), ItemDrop(items[1], 4250, 750)] ## what item spawns where
 
     for item in items_to_remove:
         for item2 in items:
             if item2.name == item:
                 player.inventory.add_item(item2)
         
-        if item in ground_items:
-            index = ground_items.index(item)
-            ground_items.remove(item)
-            item_spawns.pop(index)
+        ground_items = [drop for drop in ground_items if drop.item.name != item]
     player.hand = player.inventory.items[0] if player.inventory.items else None
     ##removes items from the ground if they are in the inventory and sets the players hand to first item in inventory
 
@@ -281,7 +255,7 @@ def play(screen, clock, font, settings, controls):
         Portal("D", 2248, 2315, 2975, 2990, 4200, 700, items[10]),
         Portal("E", 1030, 1075 , 1820, 1875, 3530, 3085, items[1]),
         Portal("F", 3500, 3552, 3066, 3104, 1140, 1845, items[2] ),
-        Portal("G", 4343, 4629, 900, 1170, 2280, 3030, items[6])]    
+        Portal("G", 4343, 4629, 900, 1170, 2280, 3030, items[6])]
 
     signs = [
         Sign(500, 600, 6110, 6120, "Thank you for saving us from the evil monster!! You have officially beat the game and saved the region"),
@@ -294,9 +268,13 @@ def play(screen, clock, font, settings, controls):
         Sign(1150, 1175, 1760, 1780, "The boss is even stronger, but drops the key to finish the game!"), # final cave door
         Sign(100, 125, 2325, 2350, "You need to get the royal seal to open the final door!")]
     ## definitions of all regions in the game --- portals and destinations along with all the signs
+    step = FixedStep(settings["gameplay"].get("sim_rate", 60)) ## the game is simulated at this rate whatever the frame rate is
+    max_fps = settings["video"].get("max_fps", 120)
+    keys = pygame.key.get_pressed()
+    enemies = zones.update(player.x, player.y)
     while True and not player.is_dead(): ## only runs if player is alive, otherwise goes back to menu
         player.hand = player.inventory.items[0] if player.inventory.items else None ## always updates player hand first
-        dt = clock.tick(120) / 1000.0 ## starts the clock tick for smooth fps movement
+        frame_dt = clock.tick(max_fps) / 1000.0 ## how long the last frame took, the simulation catches up on it below
 
         for e in pygame.event.get():
             if e.type == pygame.QUIT:
@@ -320,28 +298,90 @@ def play(screen, clock, font, settings, controls):
 
                     
         keys = pygame.key.get_pressed() ## used for all actions after
-        volume = settings["audio"]["volume"]
-        noise = 0
-        if volume == "Low":
-            noise = 0.33
-        elif volume == "Medium":
-            noise = 0.66
-        elif volume == "High":
-            noise = 1.0
-        if settings["audio"]["mute"]:
-            noise = 0    
-
-        pygame.mixer.music.set_volume(noise)
-        player.ranged(keys, controls)
-        player.update_projectiles(dt, enemies)
-        player.melee(keys, controls, enemies)  ## Check for attack input
-
-        player.update_attack(dt)  ## Update attack animation
-        player.move(dt, keys, controls, world.collides, settings)
-        player.heal(keys, controls)
-        player.equip_armour(keys, controls) ## entire player update handling all methods in player class that are needed
-    
-       
+        sounds.apply_settings(settings["audio"]) ## only changes the mixer volume after the options screen changed it
+
+        for _ in range(step.steps(frame_dt)): ## none on a frame shorter than a step, several after a slow one
+            dt = step.dt
+            step.snapshot([player, player.pet] + enemies) ## where everything was, drawing blends from here to where it ends up
+            player.ranged(keys, controls)
+            enemies = zones.update(player.x, player.y) ## only enemies in zones near the player are updated, collided and drawn
+            neighbours.rebuild(enemies) ## answers "which enemies are near here" for hits and separation this step
+            player.update_projectiles(dt, enemies, neighbours, world.collides_array)
+            player.melee(keys, controls, enemies, neighbours)  ## Check for attack input
+
+            player.update_attack(dt)  ## Update attack animation
+            player.move(dt, keys, controls, world.collides_fast, settings)
+            player.heal(keys, controls)
+            player.equip_armour(keys, controls) ## entire player update handling all methods in player class that are needed
+
+            if flow is not None:
+                flow.update(player.x, player.y) ## only rebuilt when the player changes tile
+            if swarm is not None:
+                swarm.track(enemies, player, dt, world.collides_array, tracking_range, min_range, flow) ## every swarm enemy in one go
+                neighbours.rebuild(enemies) ## the swarm just moved
+            for enemy, enemy_dt in ai.due([e for e in enemies if not isinstance(e, SwarmEnemy)], player, dt):
+                enemy.track(player, enemy_dt, enemies,world.collides_fast, tracking_range, min_range, neighbours, flow)
+            for enemy in enemies:
+                if enemy.is_dead():
+                    zones.remove(enemy)
+                    neighbours.remove(enemy)
+                    if isinstance(enemy, SwarmEnemy):
+                        swarm.remove(enemy)
+                    player.xp += 100
+                    if player.xp >= player.xp_next:
+                        player.level_up(items) ## gives xp for leveling up 
+
+            ground_items = [drop for drop in ground_items if not drop.pickup(player, keys, controls)]
+
+            if handle_portals(player, portals, keys, controls, dt):
+                world.invalidate_view() ## a teleport means nothing from the last frame can be reused
+                step.forget(player) ## drawn at the portal's target instead of sliding there
+                step.forget(player.pet)
+            player.pet.update(player, dt) ## follows wherever the player ended up this step
+
+            Mini_boss_region = Region(4000,5000, 500, 1500)
+            ##defining area where mini boss spawns
+            if Mini_boss_region.contains(player.x, player.y) and not mini_boss_defeated:
+                mini_sprite = ap("characters", "Boss", "Boss 01.png")
+
+                if not mini_made:
+
+                    mini_boss = Boss("Mini Boss", 4500, 1000, 2000, 100, 90, 175, mini_sprite,0)
+                    zones.add(mini_boss, always=True) ## the boss will only spawn when the player enters the regions and will only spawn once
+                    mini_made = True
+                if mini_boss.is_dead():
+                    mini_boss_defeated = True
+
+                    player.level_up(items)
+                    player.level_up(items)
+                    player.level_up(items)
+                    player.inventory.add_item(items[6])
+            
+            Boss_region = Region(4178, 4592, 3625, 4005)
+            if Boss_region.contains(player.x, player.y) and not boss_defeated:
+                boss_sprite = ap("characters", "Boss", "Boss 01.png")
+
+                enemy_sprite = ap("characters", "Enemy", "Enemy 16-2.png")
+                if not boss_made:
+
+                    boss = Boss("Boss", 4500, 3800, 3000, 150, 80, 175, boss_sprite,3)
+                    zones.add(boss, always=True) ## bosses never sleep
+                    boss_made = True
+                if boss.is_dead():
+                    boss_defeated = True
+                    player.level_up(items)
+                    player.level_up(items)
+                    player.level_up(items)
+                    player.inventory.add_item(items[11]) ## same framework used for boss as miniboss just changed the stats and item added
+                if random.random() < SUPPORT_SPAWN_RATE * dt:
+                    random_enemy = Enemy("support", random.randint(4178,4592), random.randint(3625, 4005), 500, 20, 10, 200, enemy_sprite)
+                    zones.add(random_enemy) ## gives the boss a chance to spawn a support enemy to make the fight more dynamic and interesting
+            if player.is_dead():
+                break
+
+        ## everything below only draws, player and enemies are put between their last two steps for it
+        moved = step.blend([player, player.pet] + enemies)
+
         ## camera follows player, clamped
         sw, sh = screen.get_size()
         cam_x = int(player.x - sw/2)
@@ -351,79 +391,23 @@ def play(screen, clock, font, settings, controls):
         cam_y = max(0, min(cam_y, max(0, world.height_px - sh)))
 
         world.draw(screen, cam_x, cam_y, player) ## player is drawn in world draw to allow for foreground and background layers
-  
+
         for enemy in enemies:
-            enemy.track(player, dt, enemies,world.collides, tracking_range, min_range)
             if isinstance(enemy, Boss):
                 enemy.boss_draw(screen, cam_x, cam_y)
             else:
                 enemy.draw(screen, cam_x, cam_y)
-            enemy.draw_health_bar(screen, cam_x, cam_y) ## basic checking for enemy tracking and drawing, along with hp bars for enemies
-            if enemy.is_dead():
-                enemies.remove(enemy)
-                player.xp += 100
-                if player.xp >= player.xp_next:
-                    player.level_up(items) ## gives xp for leveling up 
+            enemy.draw_health_bar(screen, cam_x, cam_y) ## basic drawing for enemies, along with hp bars for enemies
         
-        screen.blit(font.render("ESC = Menu", True, WHITE), (20, 20))
-        screen.blit(font.render(f"Player: ({int(player.x)}, {int(player.y)})", True, WHITE), (20, 50))
-        backpack_img = pygame.image.load("assets/general png/backpack1.png").convert_alpha()
-
-        screen.blit(backpack_img, (1200, 600))
-        screen.blit(small_font.render("[I] Inventory", True, WHITE), (1100, 670))
-        draw_health_bar(screen, 1000, 20, player.hp, player.hp_max)
-        draw_xp_bar(screen, 1000, 50, player.xp, player.xp_next, player.level, font)
-
-        draw_items_ground(player, screen, ground_items, item_spawns, cam_x, cam_y)
-        player.draw_projectiles(screen, cam_x, cam_y) 
+        draw_items_ground(player, screen, ground_items, cam_x, cam_y)
+        player.draw_projectiles(screen, cam_x, cam_y, (1 - step.alpha()) * step.dt) ## shots are drawn the same way back along their path
+        step.restore(moved)
+        hud.draw(screen, player) ## bars, text, backpack and hotbar in one blit, only changed parts are redrawn
         ##draws all these parts above the world draw so they remain visible and on top of the world and enemies
 
-        for item in ground_items:
-            ground_items, item_spawns = item.pickup(player, item_spawns[ground_items.index(item)], ground_items, item_spawns, keys, controls)
-
-        handle_portals(player, portals, keys, controls)
         for sign in signs:
             if sign.contains(player.x, player.y) and keys[controls["use"]]:
                 sign.write_message(screen,font)
         ## handles all interactions with signs and portals 
 
-        Mini_boss_region = Region(4000,5000, 500, 1500)
-        ##defining area where mini boss spawns
-        if Mini_boss_region.contains(player.x, player.y) and not mini_boss_defeated:
-            mini_sprite = ap("characters", "Boss", "Boss 01.png")
-
-            if not mini_made:
-
-                mini_boss = Boss("Mini Boss", 4500, 1000, 2000, 100, 90, 175, mini_sprite,0)
-                enemies.append(mini_boss) ## the boss will only spawn when the player enters the regions and will only spawn once
-                mini_made = True
-            if mini_boss.is_dead():
-                mini_boss_defeated = True
-
-                player.level_up(items)
-                player.level_up(items)
-                player.level_up(items)
-                player.inventory.add_item(items[6])
-        
-        Boss_region = Region(4178, 4592, 3625, 4005)
-        if Boss_region.contains(player.x, player.y) and not boss_defeated:
-            boss_sprite = ap("characters", "Boss", "Boss 01.png")
-
-            enemy_sprite = ap("characters", "Enemy", "Enemy 16-2.png")
-            if not boss_made:
-
-                boss = Boss("Boss", 4500, 3800, 3000, 150, 80, 175, boss_sprite,3)
-                enemies.append(boss)
-                boss_made = True
-            if boss.is_dead():
-                boss_defeated = True
-                player.level_up(items)
-                player.level_up(items)
-                player.level_up(items)
-                player.inventory.add_item(items[11]) ## same framework used for boss as miniboss just changed the stats and item added
-            boss_num = random.randint(1, 100)
-            if boss_num == 67:
-                random_enemy = Enemy("support", random.randint(4178,4592), random.randint(3625, 4005), 500, 20, 10, 200, enemy_sprite)
-                enemies.append(random_enemy) ## gives the boss a 1% chance to spawn a support enemy to make the fight more dynamic and interesting
-        draw_hotbar(player, screen)
         pygame.display.flip()
\ No newline at end of file
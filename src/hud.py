@@ -0,0 +1,93 @@
+import pygame
+from settings import ap
+from ui import WHITE, GREEN, render_text, text_pieces
+from assets import assets
+
+## the in game overlay, every widget keeps what it last drew and is only drawn again when the value it shows changes,
+## the whole overlay then goes on screen in one blits call
+
+PURPLE = (255,0,255) ## xp bar colour
+
+
+def draw_health_bar(screen, x, y, hp, hp_max):
+    w, h = 250, 28
+    fill = int((hp / hp_max) * w) if hp_max > 0 else 0
+    pygame.draw.rect(screen, GREEN, (x, y, fill, h))
+    pygame.draw.rect(screen, WHITE, (x, y, w, h), 2) ## draws the players hp bar scalling the bar to the players hp
+
+def draw_xp_bar(screen, x, y, xp, xp_next, level, font):
+    w, h = 250, 15
+    fill = int((xp / xp_next) * w) if xp_next > 0 else 0
+    pygame.draw.rect(screen, PURPLE, (x, y, fill, h))
+    pygame.draw.rect(screen, WHITE, (x, y, w, h), 2)
+    ## write level and xp text
+    text = render_text(font, f"Level {level} - XP: {xp}/{xp_next}", WHITE) ## from the glyph atlas, no FreeType
+    ## scale down to fit below the bar
+    text = pygame.transform.scale(text, (text.get_width() * 0.3, text.get_height() * 0.3))
+    screen.blit(text, (x, y + 15))
+
+class Widget:
+    def __init__(self, key, render):
+        self.key = key ## player -> the value shown, the widget is only redrawn when this changes
+        self.render = render ## (player, screen size) -> [(surface, position on screen), ...]
+        self.value = None
+        self.pieces = None ## kept until the value changes
+
+
+class HUD:
+    def __init__(self, font, small_font):
+        self.font = font
+        self.small_font = small_font
+        self.backpack = assets.image(ap("general png", "backpack1.png")) ## loaded once, not every frame
+        self.slot = pygame.Surface((64, 64))
+        self.slot.set_alpha(150)
+        self.slot.fill((50, 50, 50)) ## semi-transparent background of a hotbar slot
+        self.size = None
+        self.renders = 0 ## widget redraws so far, for the benchmarks
+        static = lambda player: True ## text and pictures that never change are drawn once
+        self.widgets = [
+            Widget(static, lambda player, size: [(self.font.render("ESC = Menu", True, WHITE), (20, 20))]),
+            Widget(lambda player: (int(player.x), int(player.y)), self._position),
+            Widget(static, lambda player, size: [(self.backpack, (1200, 600))]),
+            Widget(static, lambda player, size: [(self.small_font.render("[I] Inventory", True, WHITE), (1100, 670))]),
+            Widget(lambda player: int((player.hp / player.hp_max) * 250) if player.hp_max > 0 else 0, self._health), ## only the bar width matters
+            Widget(lambda player: (player.xp, player.xp_next, player.level), self._xp),
+            Widget(lambda player: tuple(player.inventory.items[:5]), self._hotbar),
+        ]
+
+    def _position(self, player, size):
+        return text_pieces(self.font, f"Player: ({int(player.x)}, {int(player.y)})", WHITE, (20, 50)) ## one blit per glyph
+
+    def _health(self, player, size):
+        surface = pygame.Surface((250, 28), pygame.SRCALPHA)
+        draw_health_bar(surface, 0, 0, player.hp, player.hp_max)
+        return [(surface, (1000, 20))]
+
+    def _xp(self, player, size):
+        surface = pygame.Surface((250, 15 + self.font.get_linesize()), pygame.SRCALPHA) ## room for the shrunk text under the bar
+        draw_xp_bar(surface, 0, 0, player.xp, player.xp_next, player.level, self.font)
+        return [(surface, (1000, 50))]
+
+    def _hotbar(self, player, size):
+        ## the slot borders are one surface, the backgrounds and items go straight on the screen so they blend like they always did
+        y = size[1] - 78
+        borders = pygame.Surface((364, 68), pygame.SRCALPHA) ## 5 slots of 68 px, 74 px apart
+        for i in range(5):
+            pygame.draw.rect(borders, WHITE, (74 * i, 0, 68, 68), 2) ## draws hotbar slots
+        return ([(borders, (28, y - 4))] + [(self.slot, (30 + 74 * i, y - 2)) for i in range(5)] +
+                [(item.image, (32 + 74 * i, y)) for i, item in enumerate(player.inventory.items[:5])])
+
+    def draw(self, screen, player):
+        size = screen.get_size()
+        if size != self.size:
+            self.size = size ## a new screen size moves the hotbar, everything is redrawn
+            for widget in self.widgets:
+                widget.pieces = None
+
+        for widget in self.widgets:
+            value = widget.key(player)
+            if widget.pieces is None or value != widget.value:
+                widget.value = value
+                widget.pieces = widget.render(player, size)
+                self.renders += 1
+        screen.blits([piece for widget in self.widgets for piece in widget.pieces], doreturn=False)
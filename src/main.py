@@ -6,25 +6,27 @@ import os
 from settings import load_settings, save_settings, build_controls, make_screen, ap
 from options import options_screen
 from game import play
-from ui import draw_title, clamp, DARK, WHITE, GREEN
+from ui import draw_title, clamp, run_screen, Leave, DARK, WHITE, GREEN
+from thumbnails import thumbnails
+from assets import assets
 
 
 def start_screen(screen, font):
     ## simple start screen that waits until player presses space
     ## returns True to continue or False to exit game
-    start_img = pygame.image.load(ap("screens", "screen saver.png"))
-    start_img = pygame.transform.scale(start_img, screen.get_size())
-    while True:
-        for e in pygame.event.get():
-            if e.type == pygame.QUIT:
-                return False
-            if e.type == pygame.KEYDOWN and e.key == pygame.K_SPACE:
-                return True
+    start_img = assets.image(ap("screens", "screen saver.png"), screen.get_size())
 
+    def handle(e):
+        if e.type == pygame.QUIT:
+            return Leave(False)
+        if e.type == pygame.KEYDOWN and e.key == pygame.K_SPACE:
+            return Leave(True)
+
+    def draw():
         screen.fill(DARK)
         screen.blit(start_img, (0, 0))
 
-        pygame.display.flip()
+    return run_screen(draw, handle) ## only drawn again when something happens, so it sits idle on the picture
 
 
 def main_menu(screen, font):
@@ -34,18 +36,19 @@ def main_menu(screen, font):
     options = ["Play", "Options", "Character Select", "Pick Save File", "Quit"]
     sel = 0  ## keeps track of currently selected option
 
-    while True:
-        for e in pygame.event.get():
-            if e.type == pygame.QUIT:
-                return "quit"
-            if e.type == pygame.KEYDOWN:
-                if e.key == pygame.K_w:
-                    sel = clamp(sel-1, 0, len(options)-1)  ## prevents going above first option
-                if e.key == pygame.K_s:
-                    sel = clamp(sel+1, 0, len(options)-1)  ## prevents going below last option
-                if e.key == pygame.K_SPACE:
-                    return options[sel].lower()  ## returns selected option as lowercase string
-
+    def handle(e):
+        nonlocal sel
+        if e.type == pygame.QUIT:
+            return Leave("quit")
+        if e.type == pygame.KEYDOWN:
+            if e.key == pygame.K_w:
+                sel = clamp(sel-1, 0, len(options)-1)  ## prevents going above first option
+            if e.key == pygame.K_s:
+                sel = clamp(sel+1, 0, len(options)-1)  ## prevents going below last option
+            if e.key == pygame.K_SPACE:
+                return Leave(options[sel].lower())  ## returns selected option as lowercase string
+
+    def draw():
         screen.fill(DARK)
         draw_title(screen, font, "Main Menu")
 
@@ -53,7 +56,7 @@ def main_menu(screen, font):
             color = GREEN if i == sel else WHITE  ## highlights selected option
             screen.blit(font.render(name, True, color), (520, 200 + i*90))
 
-        pygame.display.flip()
+    return run_screen(draw, handle)
 
 
 def character_select(screen, font, settings, save_settings_fn):
@@ -74,40 +77,43 @@ def character_select(screen, font, settings, save_settings_fn):
         files.sort()
         return char_dir, files
 
-    char_dir, characters = load_characters(genders[gender_id])
+    folders = {gender: load_characters(gender) for gender in genders} ## listed once, TAB just switches between them
+    char_dir, characters = folders[genders[gender_id]]
 
     if not characters:
         return  ## safety check if folder empty
 
     sel = 0  ## currently selected character index
 
-    while True:
-        for e in pygame.event.get():
-            if e.type == pygame.QUIT:
-                return
-            if e.type == pygame.KEYDOWN:
-                if e.key == pygame.K_ESCAPE:
-                    return  ## exits character select
-                if e.key == pygame.K_TAB:
-                    gender_id = (gender_id + 1) % len(genders)  ## swaps gender folder
-                    char_dir, characters = load_characters(genders[gender_id])
-                    sel = 0  ## resets selection
-                if e.key == pygame.K_a:
-                    sel = clamp(sel - 1, 0, len(characters) - 1)
-                if e.key == pygame.K_d:
-                    sel = clamp(sel + 1, 0, len(characters) - 1)
-                if e.key == pygame.K_w:
-                    sel = clamp(sel - 4, 0, len(characters) - 1)
-                if e.key == pygame.K_s:
-                    sel = clamp(sel + 4, 0, len(characters) - 1)
-                    ## grid navigation in 4 columns
-                if e.key == pygame.K_SPACE:
-                    settings["player"]["selected_character"] = {
-                        "gender": genders[gender_id],
-                        "file": characters[sel]
-                    }
-                    save_settings_fn(settings)
-                    return  ## saves selection and exits
+    def handle(e):
+        nonlocal gender_id, char_dir, characters, sel
+        if e.type == pygame.QUIT:
+            return Leave()
+        if e.type == pygame.KEYDOWN:
+            if e.key == pygame.K_ESCAPE:
+                return Leave()  ## exits character select
+            if e.key == pygame.K_TAB:
+                gender_id = (gender_id + 1) % len(genders)  ## swaps gender folder
+                char_dir, characters = folders[genders[gender_id]]
+                sel = 0  ## resets selection
+            if e.key == pygame.K_a:
+                sel = clamp(sel - 1, 0, len(characters) - 1)
+            if e.key == pygame.K_d:
+                sel = clamp(sel + 1, 0, len(characters) - 1)
+            if e.key == pygame.K_w:
+                sel = clamp(sel - 4, 0, len(characters) - 1)
+            if e.key == pygame.K_s:
+                sel = clamp(sel + 4, 0, len(characters) - 1)
+                ## grid navigation in 4 columns
+            if e.key == pygame.K_SPACE:
+                settings["player"]["selected_character"] = {
+                    "gender": genders[gender_id],
+                    "file": characters[sel]
+                }
+                save_settings_fn(settings)
+                return Leave()  ## saves selection and exits
+
+    def draw():
         ## paging logic so only 8 characters are shown at once
         page = sel // 8
         tailPoint = page * 8
@@ -121,12 +127,17 @@ def character_select(screen, font, settings, save_settings_fn):
             row = idx // 4
             x = START_X + col * GAP_X
             y = START_Y + row * GAP_Y + 100
-            img = pygame.image.load(os.path.join(char_dir, filename)).convert_alpha()
-            img = pygame.transform.scale(img, (TILE_W, TILE_H))
+            img = thumbnails.get(os.path.join(char_dir, filename), (TILE_W, TILE_H)) ## decoded and scaled once, then cached
             screen.blit(img, (x, y))
             if tailPoint + idx == sel:
                 pygame.draw.rect(screen,(255,0,0),(x - 6, y - 6, TILE_W + 12, TILE_H + 12),4)  ## draws highlight box around selected sprite
-        pygame.display.flip()
+
+        ## next and previous pages, then the first page of the other folder, load while the player looks at this one
+        other_dir, other = folders[genders[(gender_id + 1) % len(genders)]]
+        nearby = [os.path.join(char_dir, f) for f in characters[headPoint:headPoint + 8] + characters[max(0, tailPoint - 8):tailPoint]]
+        thumbnails.prefetch(nearby + [os.path.join(other_dir, f) for f in other[:8]], (TILE_W, TILE_H))
+
+    run_screen(draw, handle)
 
 
 def pick_save_file(screen, font):
@@ -138,21 +149,20 @@ def pick_save_file(screen, font):
 
     file = "config/savegame"
 
-    while True:
-        for e in pygame.event.get():
-            if e.type == pygame.QUIT:
-                return None
-            if e.type == pygame.KEYDOWN:
-                if e.key == pygame.K_n:
-                    with open(file + ".json", "w") as f:
-                        json.dump({}, f)  ## wipes save file completely
-                    return None
-
-
+    def handle(e):
+        if e.type == pygame.QUIT:
+            return Leave(None)
+        if e.type == pygame.KEYDOWN:
+            if e.key == pygame.K_n:
+                with open(file + ".json", "w") as f:
+                    json.dump({}, f)  ## wipes save file completely
+                return Leave(None)
 
+    def draw():
         screen.fill(DARK)
         draw_title(screen, font, "Press N for New Game or L to Load Game")
-        pygame.display.flip()
+
+    return run_screen(draw, handle)
 
 
 def main():
@@ -171,7 +181,8 @@ def main():
     screen = make_screen(settings)
     clock = pygame.time.Clock()
 
-    font = pygame.font.Font(ap("fonts", "path.ttf"), 40)
+    assets.set_budget(settings["video"].get("asset_budget_mb", 128)) ## decoded images and sounds past this are let go, oldest first
+    font = assets.font(40)
 
     if not start_screen(screen, font):
         pygame.quit()
@@ -0,0 +1,322 @@
+import base64
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+import xml.etree.ElementTree as ET
+from array import array
+import numpy as np
+
+## compiles a tiled .tmx map into a compact binary file that can be memory mapped on the next launch,
+## so the game doesnt have to parse megabytes of xml/csv every time a world is made
+
+MAGIC = b"BMAP"
+VERSION = 1
+CACHE_DIR = "cache/maps"
+HEADER = struct.Struct("<4sIQQ20sI") ## magic, version, source mtime, source size, source sha1, length of the json metadata
+GID_MASK = 0x1FFFFFFF ## the top 3 bits of a tiled gid are flip flags
+SHAPES = ["rect", "ellipse", "point", "polygon", "polyline"]
+
+
+def _hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def _parse_tile_data(data_el, width, height):
+    encoding = data_el.get("encoding")
+    compression = data_el.get("compression")
+
+    if data_el.find("chunk") is not None:
+        raise ValueError("infinite maps with chunked layers are not supported")
+
+    if encoding == "csv":
+        return [int(v) for v in data_el.text.split(",")]
+
+    if encoding == "base64":
+        raw = base64.b64decode(data_el.text.strip())
+        if compression == "zlib":
+            raw = zlib.decompress(raw)
+        elif compression == "gzip":
+            raw = gzip.decompress(raw)
+        elif compression:
+            raise ValueError(f"unsupported layer compression: {compression}")
+        return list(struct.unpack(f"<{width * height}I", raw))
+
+    if encoding is None:
+        return [int(t.get("gid", 0)) for t in data_el.iter("tile")] ## old xml format, one element per tile
+
+    raise ValueError(f"unsupported layer encoding: {encoding}")
+
+
+def _object_shape(obj):
+    for shape in SHAPES[1:]:
+        if obj.find(shape) is not None:
+            return SHAPES.index(shape)
+    return 0 ## plain rectangle
+
+
+def compile_map(tmx_path, out_path):
+    root = ET.parse(tmx_path).getroot()
+    if root.get("infinite") == "1":
+        raise ValueError("infinite maps are not supported")
+
+    width = int(root.get("width"))
+    height = int(root.get("height"))
+
+    tilesets = []
+    for ts in root.findall("tileset"):
+        if ts.get("source") is None:
+            raise ValueError("embedded tilesets are not supported, export them to a .tsx")
+        tilesets.append({"firstgid": int(ts.get("firstgid")), "source": ts.get("source")})
+
+    ## tiles are stored as uint16 indexes into a table of the raw gids actually used, flip flags included,
+    ## which keeps every layer at 2 bytes per tile even though flipped gids dont fit in 16 bits
+    gids = [0]
+    index = {0: 0}
+    layers = []
+    groups = []
+    blobs = []
+    offset = 0
+
+    def add_blob(arr):
+        nonlocal offset
+        data = arr.tobytes()
+        blobs.append(data)
+        start = offset
+        offset += len(data)
+        pad = -offset % 8 ## keeps every array 8 byte aligned
+        if pad:
+            blobs.append(b"\0" * pad)
+            offset += pad
+        return start, len(arr)
+
+    for el in root:
+        if el.tag == "layer":
+            raw = _parse_tile_data(el.find("data"), width, height)
+            packed = array("H")
+            for gid in raw:
+                i = index.get(gid)
+                if i is None:
+                    i = index[gid] = len(gids)
+                    gids.append(gid)
+                packed.append(i)
+            if len(gids) > 0xFFFF:
+                raise ValueError("too many distinct tiles for a 16 bit layer")
+            start, count = add_blob(packed)
+            layers.append({
+                "name": el.get("name", ""),
+                "visible": el.get("visible", "1") != "0",
+                "offset": start,
+                "count": count,
+            })
+
+        elif el.tag == "objectgroup":
+            rects = array("d")
+            names, types, shapes = [], [], []
+            for obj in el.findall("object"):
+                rects.extend((float(obj.get("x", 0)), float(obj.get("y", 0)),
+                              float(obj.get("width", 0)), float(obj.get("height", 0))))
+                names.append(obj.get("name", ""))
+                types.append(obj.get("type", obj.get("class", "")))
+                shapes.append(_object_shape(obj))
+            start, count = add_blob(rects)
+            groups.append({
+                "name": el.get("name", ""),
+                "visible": el.get("visible", "1") != "0",
+                "offset": start,
+                "count": count // 4,
+                "names": names,
+                "types": types,
+                "shapes": shapes,
+            })
+
+    start, _ = add_blob(array("I", gids))
+    meta = {
+        "width": width,
+        "height": height,
+        "tilewidth": int(root.get("tilewidth")),
+        "tileheight": int(root.get("tileheight")),
+        "byteorder": sys.byteorder,
+        "tilesets": tilesets,
+        "gids": {"offset": start, "count": len(gids)},
+        "layers": layers,
+        "objectgroups": groups,
+    }
+    meta_bytes = json.dumps(meta).encode("utf-8")
+    meta_bytes += b" " * (-(HEADER.size + len(meta_bytes)) % 8) ## pads so the arrays after it stay aligned
+
+    st = os.stat(tmx_path)
+    header = HEADER.pack(MAGIC, VERSION, st.st_mtime_ns, st.st_size, _hash_file(tmx_path), len(meta_bytes))
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(meta_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, out_path) ## swaps in the finished file so a crash never leaves half a cache behind
+
+
+class TileLayer:
+    def __init__(self, name, visible, data):
+        self.name = name
+        self.visible = visible
+        self.height, self.width = data.shape
+        self.data = data ## 2d uint16 array [y, x] straight over the mapped file, no copy
+
+    def row(self, y):
+        return self.data[y]
+
+    def window(self, x0, y0, x1, y1):
+        return self.data[max(0, y0):min(self.height, y1), max(0, x0):min(self.width, x1)] ## clipped to the map, still a view
+
+    def nonempty(self, x0, y0, x1, y1):
+        return self.window(x0, y0, x1, y1) != 0
+
+    def row_runs(self, y, x0, x1):
+        ## (start, end) pairs of consecutive non empty tiles in one row between x0 and x1
+        x0 = max(0, x0)
+        filled = np.concatenate(([False], self.data[y, x0:min(self.width, x1)] != 0, [False]))
+        edges = np.flatnonzero(filled[1:] != filled[:-1]) + x0
+        return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+class MapObject:
+    def __init__(self, name, type, shape, x, y, width, height):
+        self.name = name
+        self.type = type
+        self.shape = shape
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+
+class ObjectGroup:
+    def __init__(self, name, visible, objects):
+        self.name = name
+        self.visible = visible
+        self.objects = objects
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def __len__(self):
+        return len(self.objects)
+
+
+class CompiledMap:
+    def __init__(self, path, source_path):
+        self.path = path
+        self.source_path = source_path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        _, _, _, _, _, meta_len = HEADER.unpack_from(self._mm, 0)
+        meta = json.loads(bytes(self._mm[HEADER.size:HEADER.size + meta_len]))
+        if meta["byteorder"] != sys.byteorder:
+            self._mm.close()
+            raise ValueError("map cache was built on a machine with a different byte order")
+        body = HEADER.size + meta_len ## where the arrays start in the file
+
+        self.width = meta["width"]
+        self.height = meta["height"]
+        self.tile_w = meta["tilewidth"]
+        self.tile_h = meta["tileheight"]
+
+        base = os.path.dirname(source_path)
+        self.tilesets = [(ts["firstgid"], os.path.normpath(os.path.join(base, ts["source"])))
+                         for ts in meta["tilesets"]] ## tileset paths are relative to the tmx file
+
+        g = meta["gids"]
+        self.gids = np.frombuffer(self._mm, np.uint32, g["count"], body + g["offset"]) ## tile index -> raw tiled gid with flip flags
+
+        self.layers = []
+        for layer in meta["layers"]:
+            data = np.frombuffer(self._mm, np.uint16, layer["count"], body + layer["offset"])
+            self.layers.append(TileLayer(layer["name"], layer["visible"], data.reshape(self.height, self.width)))
+
+        self.objectgroups = []
+        for group in meta["objectgroups"]:
+            rects = np.frombuffer(self._mm, np.float64, group["count"] * 4, body + group["offset"]).reshape(-1, 4)
+            objects = [
+                MapObject(group["names"][i], group["types"][i], SHAPES[group["shapes"][i]], *rect)
+                for i, rect in enumerate(rects.tolist())
+            ]
+            self.objectgroups.append(ObjectGroup(group["name"], group["visible"], objects))
+
+    def get_layer(self, name):
+        for layer in self.layers + self.objectgroups:
+            if layer.name == name:
+                return layer
+        return None
+
+
+def _read_header(path):
+    try:
+        with open(path, "rb") as f:
+            head = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(head) < HEADER.size:
+        return None
+    header = HEADER.unpack(head)
+    if header[0] != MAGIC or header[1] != VERSION:
+        return None ## old or foreign file, will be rebuilt
+    return header
+
+
+def _update_header(path, st):
+    ## same contents under a new mtime (checkout, copy, touch), records it so the next launch skips the hash
+    try:
+        with open(path, "r+b") as f:
+            f.seek(struct.calcsize("<4sI")) ## past the magic and version
+            f.write(struct.pack("<QQ", st.st_mtime_ns, st.st_size))
+    except OSError:
+        pass ## read only cache, it still loads, just hashes again next time
+
+
+def cache_path(tmx_path, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(tmx_path))[0]
+    tag = hashlib.sha1(os.path.abspath(tmx_path).encode("utf-8")).hexdigest()[:8] ## stops two maps with the same name sharing a cache
+    return os.path.join(cache_dir, f"{stem}-{tag}.bmap")
+
+
+def load_map(tmx_path, cache_dir=CACHE_DIR):
+    out_path = cache_path(tmx_path, cache_dir)
+    header = _read_header(out_path)
+
+    if header is not None:
+        st = os.stat(tmx_path)
+        if (header[2], header[3]) != (st.st_mtime_ns, st.st_size):
+            ## the file was touched, only rebuild if the contents actually changed
+            if header[4] != _hash_file(tmx_path):
+                header = None
+            else:
+                _update_header(out_path, st)
+
+    if header is not None:
+        try:
+            return CompiledMap(out_path, tmx_path)
+        except ValueError:
+            pass ## falls through and rebuilds it
+
+    os.makedirs(cache_dir, exist_ok=True)
+    compile_map(tmx_path, out_path)
+    return CompiledMap(out_path, tmx_path)
+
+
+if __name__ == "__main__":
+    ## python src/mapcache.py assets/maps/bananas_map.tmx  -> builds the cache ahead of time
+    for tmx in sys.argv[1:]:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        compile_map(tmx, cache_path(tmx))
+        print(f"{tmx} -> {cache_path(tmx)}")
@@ -1,5 +1,6 @@
 import pygame
-from ui import draw_title, clamp, DARK, WHITE, GREEN
+from ui import draw_title, clamp, run_screen, Leave, DARK, WHITE, GREEN
+from assets import assets
 
 
 def options_screen(screen, font, settings, save_settings_fn):
@@ -10,49 +11,51 @@ def options_screen(screen, font, settings, save_settings_fn):
     diffs = ["Easy", "Normal", "Hard"]  ## possible difficulty values
     volumes = ["Mute", "Low", "Medium", "High"]  ## possible volume values
 
-    while True:
-        for e in pygame.event.get():
-            if e.type == pygame.QUIT:
-                return "quit"
+    small_font = assets.font(30) ## loaded once, the same font every time options is opened
 
-            if e.type == pygame.KEYDOWN:
-                if e.key == pygame.K_ESCAPE:
-                    return "back"  ## allows quick exit from options
+    def handle(e):
+        nonlocal sel
+        if e.type == pygame.QUIT:
+            return Leave("quit")
 
-                if e.key == pygame.K_w:
-                    sel = clamp(sel-1, 0, len(items)-1)  ## moves selection up safely
+        if e.type == pygame.KEYDOWN:
+            if e.key == pygame.K_ESCAPE:
+                return Leave("back")  ## allows quick exit from options
 
-                if e.key == pygame.K_s:
-                    sel = clamp(sel+1, 0, len(items)-1)  ## moves selection down safely
+            if e.key == pygame.K_w:
+                sel = clamp(sel-1, 0, len(items)-1)  ## moves selection up safely
 
-                if e.key == pygame.K_SPACE:
-                    if items[sel] == "Difficulty":
-                        cur = settings["gameplay"]["difficulty"]
-                        idx = diffs.index(cur) if cur in diffs else 1
-                        ## cycles to next difficulty in list
-                        settings["gameplay"]["difficulty"] = diffs[(idx+1) % len(diffs)]
-                        save_settings_fn(settings)  ## saves immediately so change persists
+            if e.key == pygame.K_s:
+                sel = clamp(sel+1, 0, len(items)-1)  ## moves selection down safely
 
-                    elif items[sel] == "Fullscreen":
-                        settings["video"]["fullscreen"] = not settings["video"]["fullscreen"]
-                        ## toggles fullscreen boolean value
-                        save_settings_fn(settings)
-                    elif items[sel] == "Volume":
-                        settings["audio"]["volume"] = volumes[(volumes.index(settings["audio"]["volume"]) + 1) % len(volumes)]
+            if e.key == pygame.K_SPACE:
+                if items[sel] == "Difficulty":
+                    cur = settings["gameplay"]["difficulty"]
+                    idx = diffs.index(cur) if cur in diffs else 1
+                    ## cycles to next difficulty in list
+                    settings["gameplay"]["difficulty"] = diffs[(idx+1) % len(diffs)]
+                    save_settings_fn(settings)  ## saves immediately so change persists
 
-                        settings["audio"]["mute"] = (settings["audio"]["volume"] == "Mute")
+                elif items[sel] == "Fullscreen":
+                    settings["video"]["fullscreen"] = not settings["video"]["fullscreen"]
+                    ## toggles fullscreen boolean value
+                    save_settings_fn(settings)
+                elif items[sel] == "Volume":
+                    settings["audio"]["volume"] = volumes[(volumes.index(settings["audio"]["volume"]) + 1) % len(volumes)]
 
-                        save_settings_fn(settings)
+                    settings["audio"]["mute"] = (settings["audio"]["volume"] == "Mute")
 
-                    else:
-                        return "back"  ## if "Back" selected, exit options screen
+                    save_settings_fn(settings)
 
+                else:
+                    return Leave("back")  ## if "Back" selected, exit options screen
+
+    def draw():
         screen.fill(DARK)
         draw_title(screen, font, "Options")
 
         ## displays current settings at top for clarity
         info = f'Difficulty: {settings["gameplay"]["difficulty"]}   Fullscreen: {settings["video"]["fullscreen"]}  Volume: {"Muted" if settings["audio"]["mute"] else settings["audio"]["volume"]}'
-        small_font = pygame.font.Font("assets/fonts/path.ttf", 30)
         screen.blit(small_font.render(info, True, WHITE), (40, 90))
 
         ## draws selectable menu items
@@ -60,4 +63,4 @@ def options_screen(screen, font, settings, save_settings_fn):
             color = GREEN if i == sel else WHITE  ## highlights selected item
             screen.blit(font.render(name, True, color), (520, 200 + i*90))
 
-        pygame.display.flip()
\ No newline at end of file
+    return run_screen(draw, handle) ## sleeps until a key is pressed, the screen only changes then
@@ -0,0 +1,150 @@
+import heapq
+import numpy as np
+
+## flow field (dijkstra map) towards the player over the tiles around them, every enemy just looks up
+## which way to step from the tile it is on instead of searching a path of its own
+
+STRAIGHT, DIAGONAL = 10, 14 ## step costs, diagonal is ~10 * sqrt(2)
+UNREACHED = 1 << 30
+STEPS = [(1, 0, STRAIGHT), (-1, 0, STRAIGHT), (0, 1, STRAIGHT), (0, -1, STRAIGHT),
+         (1, 1, DIAGONAL), (1, -1, DIAGONAL), (-1, 1, DIAGONAL), (-1, -1, DIAGONAL)]
+ROOT_HALF = 0.7071067811865476
+
+
+class FlowField:
+    def __init__(self, world, radius=24, margin=6, size=(48, 60)):
+        self.world = world
+        self.radius = radius ## tiles from the player the field reaches
+        self.margin = margin ## the area is only moved once the player gets this close to its edge
+        self.size = size ## enemy rect, a tile is walkable when an enemy centred on it doesnt hit a wall
+        self.goal = None ## player tile the field points to
+        self.x0 = self.y0 = 0 ## map tile of the area's top left
+        self.w = self.h = 0
+        self.dist = [] ## flat list of path costs to the goal, UNREACHED where there is no path
+        self.dir_x = self.dir_y = None ## 2d arrays of the unit step to take from each tile, 0, 0 where there is none
+        self.rows = [] ## the same steps as nested lists for cheap single lookups
+
+    def _area(self, gx, gy):
+        world = self.world
+        self.x0 = max(0, gx - self.radius)
+        self.y0 = max(0, gy - self.radius)
+        self.w = min(world.map.width, gx + self.radius + 1) - self.x0
+        self.h = min(world.map.height, gy + self.radius + 1) - self.y0
+
+        ys, xs = np.mgrid[self.y0:self.y0 + self.h, self.x0:self.x0 + self.w]
+        cw, ch = self.size
+        left = xs * world.tile_w + world.tile_w // 2 - cw // 2
+        top = ys * world.tile_h + world.tile_h // 2 - ch // 2
+        blocked = world.collides_array(left.ravel(), top.ravel(), cw, ch).reshape(self.h, self.w)
+        self.open = (~blocked).ravel().tolist()
+
+        ## for each step, which tiles can take it, diagonals only when both straight tiles beside them are open too
+        w, h = self.w, self.h
+        open_ = np.zeros((h + 2, w + 2), bool)
+        open_[1:-1, 1:-1] = ~blocked
+        self.links = []
+        for dx, dy, cost in STEPS:
+            ok = open_[1 + dy:1 + dy + h, 1 + dx:1 + dx + w].copy() ## the tile it lands on, off the area counts as closed
+            if dx and dy:
+                ok &= open_[1:-1, 1 + dx:1 + dx + w] & open_[1 + dy:1 + dy + h, 1:-1]
+            self.links.append((dy * w + dx, cost, ok.ravel().tolist()))
+
+    def _spread(self, heap):
+        ## dijkstra that only ever lowers costs, used for both the full build and the incremental update
+        dist, links = self.dist, self.links
+        while heap:
+            d, i = heapq.heappop(heap)
+            if d > dist[i]:
+                continue
+            for offset, cost, ok in links:
+                if ok[i]:
+                    j = i + offset
+                    nd = d + cost
+                    if nd < dist[j]:
+                        dist[j] = nd
+                        heapq.heappush(heap, (nd, j))
+
+    def build(self, gx, gy):
+        self._area(gx, gy)
+        self.goal = (gx, gy)
+        self.dist = [UNREACHED] * (self.w * self.h)
+        g = (gy - self.y0) * self.w + gx - self.x0
+        self.dist[g] = 0
+        self._spread([(0, g)])
+        self._directions()
+
+    def _step_cost(self, old, new):
+        ## cost of the single legal step old -> new inside the area, None when there isnt one
+        (ox, oy), (nx, ny) = old, new
+        i = (oy - self.y0) * self.w + ox - self.x0
+        if not self.open[i]:
+            return None ## the old goal was only reachable because goals always are
+        for (dx, dy, _), (_, cost, ok) in zip(STEPS, self.links):
+            if (dx, dy) == (nx - ox, ny - oy):
+                return cost if ok[i] else None
+        return None
+
+    def update(self, x, y):
+        ## call every frame with the player position, only does work when the player changed tile
+        gx = int(x) // self.world.tile_w
+        gy = int(y) // self.world.tile_h
+        if (gx, gy) == self.goal:
+            return False
+        inside = (self.goal is not None and
+                  self.x0 + self.margin <= gx < self.x0 + self.w - self.margin and
+                  self.y0 + self.margin <= gy < self.y0 + self.h - self.margin)
+        cost = self._step_cost(self.goal, (gx, gy)) if inside else None
+        if cost is None:
+            self.build(gx, gy) ## moved far, left the area or stepped somewhere odd
+            return True
+
+        ## every old path can still reach the new goal with one more step, so old cost + step is a safe upper bound,
+        ## then only the tiles that get a shorter path from the new goal are visited
+        self.goal = (gx, gy)
+        self.dist = [d + cost if d < UNREACHED else d for d in self.dist]
+        g = (gy - self.y0) * self.w + gx - self.x0
+        self.dist[g] = 0
+        self._spread([(0, g)])
+        self._directions()
+        return True
+
+    def _directions(self):
+        dist = np.array(self.dist, np.int64).reshape(self.h, self.w)
+        padded = np.full((self.h + 2, self.w + 2), UNREACHED, np.int64)
+        padded[1:-1, 1:-1] = dist
+        open_ = np.zeros((self.h + 2, self.w + 2), bool)
+        open_[1:-1, 1:-1] = np.array(self.open).reshape(self.h, self.w)
+
+        ## each tile steps to the neighbour with the cheapest step + remaining cost, as long as that neighbour is closer
+        best = np.full((self.h, self.w), UNREACHED, np.int64)
+        self.dir_x = np.zeros((self.h, self.w))
+        self.dir_y = np.zeros((self.h, self.w))
+        for dx, dy, cost in STEPS:
+            there = padded[1 + dy:1 + dy + self.h, 1 + dx:1 + dx + self.w]
+            through = there + cost
+            if dx and dy:
+                through = np.where(open_[1:-1, 1 + dx:1 + dx + self.w] & open_[1 + dy:1 + dy + self.h, 1:-1], through, UNREACHED)
+            better = (through < best) & (there < dist) ## tiles that are blocked themselves still point the way out
+            best = np.where(better, there, best)
+            unit = ROOT_HALF if dx and dy else 1.0
+            self.dir_x[better] = dx * unit
+            self.dir_y[better] = dy * unit
+        self.rows = [list(zip(xs, ys)) for xs, ys in zip(self.dir_x.tolist(), self.dir_y.tolist())]
+
+    def direction(self, x, y):
+        ## unit step towards the player from (x, y), None outside the area or where there is no path
+        lx = int(x) // self.world.tile_w - self.x0
+        ly = int(y) // self.world.tile_h - self.y0
+        if not (0 <= lx < self.w and 0 <= ly < self.h):
+            return None
+        step = self.rows[ly][lx]
+        return step if step != (0.0, 0.0) else None
+
+    def directions(self, xs, ys):
+        ## direction for arrays of positions, returns dir_x, dir_y and a mask of the ones that have one
+        lx = xs.astype(np.int64) // self.world.tile_w - self.x0
+        ly = ys.astype(np.int64) // self.world.tile_h - self.y0
+        inside = (lx >= 0) & (lx < self.w) & (ly >= 0) & (ly < self.h)
+        lx, ly = np.where(inside, lx, 0), np.where(inside, ly, 0)
+        dx, dy = self.dir_x[ly, lx], self.dir_y[ly, lx]
+        return dx, dy, inside & ((dx != 0) | (dy != 0))
@@ -0,0 +1,145 @@
+import math
+import numpy as np
+import pygame
+from spatial import box_pairs, cell_keys, grid_cells
+
+## every live projectile is one row in a set of preallocated numpy columns, they are all moved in one step,
+## hits are found with a swept box test so a big dt cant carry a shot through an enemy or a wall
+
+SIZE = 10 ## px, projectiles are 10x10 boxes positioned by their top left corner
+WALL_STEP = 16 ## px, longest move checked against the walls in one go, half a tile
+CELL = 128 ## px, grid used to pair projectiles with the enemies they could reach
+VELOCITY = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0)}
+
+
+def _slab(p, d, lo, hi):
+    ## when a point moving from p by d is between lo and hi on one axis, as fractions of the move
+    inside = (lo < p) & (p < hi)
+    safe = np.where(d == 0, 1.0, d)
+    t1 = (lo - p) / safe
+    t2 = (hi - p) / safe
+    enter = np.where(d == 0, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+    leave = np.where(d == 0, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+    return enter, leave
+
+
+class ProjectilePool:
+    def __init__(self, capacity=256, bounds=(0, 0, 10000, 20000)):
+        self.count = 0 ## rows [0, count) are live, retired ones are swapped out so the live ones stay packed
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.bounds = bounds ## projectiles leaving this area are retired, same limits the old list used
+        self.sprite = pygame.Surface((SIZE, SIZE))
+        self.sprite.fill((139, 69, 19)) ## brown rectangle
+        pygame.draw.rect(self.sprite, (0, 0, 0), self.sprite.get_rect(), 1) ## simple black border
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, x, y, direction, speed=600):
+        if self.count == len(self.x):
+            grow = np.zeros(len(self.x)) ## full, makes room for as many again
+            self.x, self.y, self.vx, self.vy = (np.concatenate((col, grow)) for col in (self.x, self.y, self.vx, self.vy))
+        i = self.count
+        dx, dy = VELOCITY[direction]
+        self.x[i], self.y[i] = int(x), int(y) ## starts on whole pixels like the old Rect did
+        self.vx[i], self.vy[i] = dx * speed, dy * speed
+        self.count += 1
+
+    def retire(self, rows):
+        ## swap remove, each hole below the new end is filled by a live row from the end
+        rows = np.unique(rows)
+        if not len(rows):
+            return
+        end = self.count - len(rows)
+        holes = rows[rows < end]
+        tail = np.setdiff1d(np.arange(end, self.count), rows, assume_unique=True)
+        for col in (self.x, self.y, self.vx, self.vy):
+            col[holes] = col[tail]
+        self.count = end
+
+    def swept_rects(self, dt, block=512):
+        ## the area the projectiles cover this step, used to pick the enemies worth testing,
+        ## one rect per block of the map the shots start in so shots on opposite sides dont make one map sized query
+        n = self.count
+        if not n:
+            return []
+        x, y = self.x[:n], self.y[:n]
+        nx, ny = x + self.vx[:n] * dt, y + self.vy[:n] * dt
+        left, top = np.minimum(x, nx), np.minimum(y, ny)
+        right, bottom = np.maximum(x, nx) + SIZE, np.maximum(y, ny) + SIZE
+        keys = cell_keys(*grid_cells(x, y, block))
+        order = np.argsort(keys, kind="stable")
+        starts = np.flatnonzero(np.diff(keys[order], prepend=keys[order[0]] - 1)) ## first shot of every block
+        l = np.floor(np.minimum.reduceat(left[order], starts)).astype(np.int64).tolist()
+        t = np.floor(np.minimum.reduceat(top[order], starts)).astype(np.int64).tolist()
+        r = np.ceil(np.maximum.reduceat(right[order], starts)).astype(np.int64).tolist()
+        b = np.ceil(np.maximum.reduceat(bottom[order], starts)).astype(np.int64).tolist()
+        return [pygame.Rect(l[i], t[i], r[i] - l[i], b[i] - t[i]) for i in range(len(starts))]
+
+    def update(self, dt, enemies, collides_array=None):
+        ## moves everything by dt and returns the enemy each hitting projectile struck, in no particular order
+        n = self.count
+        if not n:
+            return []
+        x0, y0 = self.x[:n].copy(), self.y[:n].copy()
+        dx, dy = self.vx[:n] * dt, self.vy[:n] * dt
+
+        ## walls, checked in steps of at most WALL_STEP px along the move
+        wall_t = np.full(n, np.inf)
+        if collides_array is not None:
+            steps = max(1, math.ceil(max(np.abs(dx).max(), np.abs(dy).max()) / WALL_STEP))
+            for k in range(1, steps + 1):
+                open_rows = np.flatnonzero(wall_t == np.inf)
+                if not len(open_rows):
+                    break
+                f = k / steps
+                px = (x0[open_rows] + dx[open_rows] * f).astype(np.int64)
+                py = (y0[open_rows] + dy[open_rows] * f).astype(np.int64)
+                wall_t[open_rows[collides_array(px, py, SIZE, SIZE)]] = f
+
+        ## enemies, the path of the box against every enemy rect grown by the box size,
+        ## only for the enemies sharing a grid cell with the path
+        hit_enemy = np.full(n, -1)
+        if enemies:
+            rects = np.array([tuple(e.rect()) for e in enemies], np.float64)
+            left, top = rects[:, 0] - SIZE, rects[:, 1] - SIZE
+            right, bottom = rects[:, 0] + rects[:, 2], rects[:, 1] + rects[:, 3]
+            x1, y1 = x0 + dx, y0 + dy
+            path = (np.minimum(x0, x1), np.minimum(y0, y1), np.maximum(x0, x1), np.maximum(y0, y1))
+            rows, js = box_pairs(path, (left, top, right, bottom), CELL)
+            if len(rows):
+                ex, lx = _slab(x0[rows], dx[rows], left[js], right[js])
+                ey, ly = _slab(y0[rows], dy[rows], top[js], bottom[js])
+                enter = np.maximum(ex, ey)
+                leave = np.minimum(lx, ly)
+                touch = (enter < leave) & (enter <= 1) & (leave > 0)
+                t = np.maximum(enter[touch], 0)
+                rows, js = rows[touch], js[touch]
+                order = np.lexsort((t, rows)) ## earliest hit first within each projectile
+                rows, js, t = rows[order], js[order], t[order]
+                first = np.flatnonzero(np.diff(rows, prepend=-1) != 0)
+                struck = t[first] <= wall_t[rows[first]] ## an enemy behind a wall is safe
+                hit_enemy[rows[first][struck]] = js[first][struck]
+
+        self.x[:n] = x0 + dx
+        self.y[:n] = y0 + dy
+        bx0, by0, bx1, by1 = self.bounds
+        gone = (hit_enemy >= 0) | (wall_t < np.inf) | (self.x[:n] < bx0) | (self.x[:n] > bx1) | (self.y[:n] < by0) | (self.y[:n] > by1)
+        hits = [enemies[j] for j in hit_enemy[hit_enemy >= 0].tolist()]
+        self.retire(np.flatnonzero(gone))
+        return hits
+
+    def draw(self, screen, cam_x, cam_y, lag=0.0):
+        ## lag is how many seconds behind the simulation the frame is drawn, shots are pulled back along their path by it
+        n = self.count
+        if not n:
+            return
+        sx = (self.x[:n] - self.vx[:n] * lag).astype(np.int64) - cam_x
+        sy = (self.y[:n] - self.vy[:n] * lag).astype(np.int64) - cam_y
+        w, h = screen.get_size()
+        on = np.flatnonzero((sx > -SIZE) & (sx < w) & (sy > -SIZE) & (sy < h)) ## only the ones on screen
+        sprite = self.sprite
+        screen.blits([(sprite, pos) for pos in zip(sx[on].tolist(), sy[on].tolist())], doreturn=False)
@@ -0,0 +1,58 @@
+import math
+import time
+
+## spreads enemy AI over frames, close enemies think every frame, further ones every few frames with the
+## time they missed added up, and a per frame time budget stops a crowd of enemies from dropping the frame rate
+
+
+class AIScheduler:
+    def __init__(self, tiers=((200, 1), (400, 3), (None, 10)), budget_ms=2.0, max_dt=0.1):
+        self.tiers = tiers ## (distance up to, update every n frames), None is everything further
+        self.budget = budget_ms / 1000
+        self.max_dt = max_dt ## longest step one update may take, a longer wait is split into several equal updates
+        self.frame = 0
+        self.pending = {} ## id(enemy) -> seconds of AI time it hasnt had yet
+        self.last = {} ## id(enemy) -> frame it last updated
+        self.updated = 0 ## how many enemies the last frame updated, for the benchmarks and debugging
+        self.skipped = 0 ## how many were due but went over the budget
+
+    def _interval(self, dist):
+        for limit, every in self.tiers:
+            if limit is None or dist < limit:
+                return every
+        return self.tiers[-1][1]
+
+    def due(self, enemies, player, dt):
+        ## yields (enemy, dt to update it with) for this frame, most urgent first, until the budget runs out,
+        ## an enemy that waited longer than max_dt is yielded several times so every second it waited is simulated
+        self.frame += 1
+        pending, last = {}, {}
+        ready = []
+        for enemy in enemies:
+            key = id(enemy)
+            waited = self.pending.get(key, 0.0) + dt
+            pending[key] = waited
+            every = self._interval(math.hypot(enemy.x - player.x, enemy.y - player.y))
+            ran = self.last.get(key)
+            if ran is None:
+                ran = self.frame - 1 - key // 16 % every ## new enemies are staggered so a tier doesnt all land on one frame
+            last[key] = ran
+            if self.frame - ran >= every:
+                ready.append((every, ran, enemy)) ## closer tiers first, then whoever waited longest
+        self.pending, self.last = pending, last ## forgets enemies that are gone
+
+        ready.sort(key=lambda r: (r[0], r[1]))
+        deadline = time.perf_counter() + self.budget
+        self.updated = 0
+        for n, (every, ran, enemy) in enumerate(ready):
+            if n and time.perf_counter() > deadline:
+                self.skipped = len(ready) - n ## they stay due and keep their time for the next frame
+                return
+            key = id(enemy)
+            steps = max(1, math.ceil(pending[key] / self.max_dt - 1e-9))
+            for _ in range(steps):
+                yield enemy, pending[key] / steps
+            pending[key] = 0.0
+            last[key] = self.frame
+            self.updated += 1
+        self.skipped = 0
@@ -0,0 +1,136 @@
+from operator import attrgetter
+import numpy as np
+
+## uniform grid hash for "what is near here" questions, anything with a position can go in it,
+## queries only look at the cells around the area instead of every object,
+## CellIndex asks the same question for whole numpy columns at once
+
+KEY = 1 << 32 ## packs a grid cell (cx, cy) into one int64 so cells can be sorted and searched
+
+
+class SpatialHash:
+    def __init__(self, cell_size=128, pos=None):
+        self.cell_size = cell_size
+        self.pos = pos or attrgetter("x", "y") ## object -> (x, y), defaults to the x/y every character has
+        self.cells = {} ## (cx, cy) -> [objects]
+        self.where = {} ## id(object) -> the cell it is filed under
+
+    def __len__(self):
+        return len(self.where)
+
+    def __contains__(self, obj):
+        return id(obj) in self.where
+
+    def _cell(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def insert(self, obj):
+        cell = self._cell(*self.pos(obj))
+        self.cells.setdefault(cell, []).append(obj)
+        self.where[id(obj)] = cell
+
+    def remove(self, obj):
+        cell = self.where.pop(id(obj), None)
+        if cell is not None:
+            bucket = self.cells[cell]
+            bucket.remove(obj)
+            if not bucket:
+                del self.cells[cell]
+
+    def update(self, obj):
+        ## call after an object moves, only touches the buckets when it crossed into another cell
+        cell = self._cell(*self.pos(obj))
+        old = self.where.get(id(obj))
+        if old == cell:
+            return
+        if old is not None:
+            self.remove(obj)
+        self.cells.setdefault(cell, []).append(obj)
+        self.where[id(obj)] = cell
+
+    def rebuild(self, objs):
+        self.cells = {}
+        self.where = {}
+        for obj in objs:
+            self.insert(obj)
+
+    def _around(self, x0, y0, x1, y1):
+        cs = self.cell_size
+        cells = self.cells
+        for cy in range(int(y0 // cs), int(y1 // cs) + 1):
+            for cx in range(int(x0 // cs), int(x1 // cs) + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    yield from bucket
+
+    def query_radius(self, x, y, r):
+        ## objects whose position is within r of (x, y)
+        r2 = r * r
+        found = []
+        for obj in self._around(x - r, y - r, x + r, y + r):
+            ox, oy = self.pos(obj)
+            if (ox - x) ** 2 + (oy - y) ** 2 <= r2:
+                found.append(obj)
+        return found
+
+    def query_rect(self, rect, pad=0):
+        ## objects whose position is inside rect grown by pad on every side,
+        ## pad is how far an object's own rect reaches from its position so nothing touching rect is missed
+        x0, y0 = rect.left - pad, rect.top - pad
+        x1, y1 = rect.right + pad, rect.bottom + pad
+        found = []
+        for obj in self._around(x0, y0, x1, y1):
+            ox, oy = self.pos(obj)
+            if x0 <= ox <= x1 and y0 <= oy <= y1:
+                found.append(obj)
+        return found
+
+
+def cell_keys(cx, cy):
+    return cx * KEY + cy
+
+
+def grid_cells(x, y, cell_size):
+    ## (cx, cy) columns of the cells the points x, y are in
+    return np.floor(x / cell_size).astype(np.int64), np.floor(y / cell_size).astype(np.int64)
+
+
+def box_cells(x0, y0, x1, y1, cell_size):
+    ## (cell key, row) for every cell each box [x0, x1] x [y0, y1] touches
+    cx0, cy0 = grid_cells(x0, y0, cell_size)
+    cx1, cy1 = grid_cells(x1, y1, cell_size)
+    keys, rows = [], []
+    for oy in range(int((cy1 - cy0).max()) + 1):
+        for ox in range(int((cx1 - cx0).max()) + 1):
+            ok = np.flatnonzero((cx0 + ox <= cx1) & (cy0 + oy <= cy1))
+            keys.append(cell_keys(cx0[ok] + ox, cy0[ok] + oy))
+            rows.append(ok)
+    return np.concatenate(keys), np.concatenate(rows)
+
+
+class CellIndex:
+    ## rows sorted by cell key once, then any number of cells are looked up together with searchsorted
+    def __init__(self, keys, rows=None):
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.rows = order if rows is None else rows[order] ## defaults to the position in keys
+
+    def lookup(self, keys):
+        ## (i, row) for every indexed row filed under keys[i]
+        start = np.searchsorted(self.keys, keys, "left")
+        counts = np.searchsorted(self.keys, keys, "right") - start
+        total = int(counts.sum())
+        if not total:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        first = np.cumsum(counts) - counts
+        i = np.repeat(np.arange(len(keys)), counts)
+        return i, self.rows[np.repeat(start, counts) + np.arange(total) - np.repeat(first, counts)]
+
+
+def box_pairs(a_box, b_box, cell_size):
+    ## (a, b) index pairs of boxes that share at least one grid cell, each pair once
+    a_keys, a_rows = box_cells(*a_box, cell_size)
+    i, b = CellIndex(*box_cells(*b_box, cell_size)).lookup(a_keys)
+    n = len(b_box[0])
+    pairs = np.unique(a_rows[i] * n + b) ## boxes sharing two cells would otherwise pair twice
+    return pairs // n, pairs % n
@@ -0,0 +1,58 @@
+import os
+import pygame
+from assets import assets
+
+## process wide registry of animation frames, each sheet is decoded, cut up and scaled once
+## and every entity using it just holds a reference to the same frames
+
+clips = {} ## (sheet path, layout, scale) -> frames
+
+
+def _key(path, layout, scale):
+    return (os.path.normpath(path), layout, scale)
+
+
+def grid_clip(path, frame_w, frame_h, rows, cols, scale=None):
+    ## frames cut from a sheet laid out in a grid, as a tuple of rows each a tuple of frames
+    ## rows can be a range or list of row numbers so a sheet with several characters on it only cuts one
+    rows = tuple(rows) if not isinstance(rows, int) else tuple(range(rows))
+    key = _key(path, ("grid", frame_w, frame_h, rows, cols), scale)
+    frames = clips.get(key)
+    if frames is None:
+        sheet = assets.image(path) ## the sheet itself is shared with anything else loading it
+        frames = []
+        for r in rows:
+            row = []
+            for c in range(cols):
+                frame = sheet.subsurface(pygame.Rect(c * frame_w, r * frame_h, frame_w, frame_h))
+                if scale is not None:
+                    frame = pygame.transform.scale(frame, scale)
+                else:
+                    frame = frame.copy() ## so the frames dont keep the whole sheet alive
+                row.append(frame)
+            frames.append(tuple(row))
+        frames = clips[key] = tuple(frames)
+    return frames
+
+
+def file_clip(paths, scale=None):
+    ## frames that are each their own image file
+    paths = tuple(paths)
+    key = (tuple(os.path.normpath(p) for p in paths), "files", scale)
+    frames = clips.get(key)
+    if frames is None:
+        frames = []
+        for path in paths:
+            frames.append(assets.image(path, scale))
+        frames = clips[key] = tuple(frames)
+    return frames
+
+
+def clip_bytes():
+    ## pixel memory held by every registered clip
+    total = 0
+    for frames in clips.values():
+        for row in frames:
+            for frame in (row if isinstance(row, tuple) else (row,)):
+                total += frame.get_width() * frame.get_height() * frame.get_bytesize()
+    return total
@@ -0,0 +1,193 @@
+import numpy as np
+from classes import Enemy
+from spatial import CellIndex, cell_keys, grid_cells
+
+## enemy state kept as numpy columns so a whole crowd is tracked in one batched step,
+## SwarmEnemy objects are thin views over one row so drawing, attacks and hp bars work as before
+
+DIRECTIONS = ["down", "left", "right", "up"]
+DOWN, LEFT, RIGHT, UP = range(4)
+SEPARATION = 90.0 ## px, enemies closer than this push each other apart, same as Enemy.track
+
+
+class EnemySwarm:
+    COLUMNS = {
+        "x": np.float64,
+        "y": np.float64,
+        "hp": np.float64,
+        "speed": np.float64,
+        "attack_timer": np.float64,
+        "attack_cooldown": np.float64,
+        "range": np.float64,
+        "attack_damage": np.int64,
+        "direction": np.int8,
+        "anim_frame": np.int8,
+        "anim_time": np.float64,
+        "tracking": np.bool_,
+    }
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.members = [] ## row -> SwarmEnemy
+        for name, dtype in self.COLUMNS.items():
+            setattr(self, name, np.zeros(capacity, dtype))
+
+    def __len__(self):
+        return self.count
+
+    def _add(self, enemy):
+        if self.count == len(self.x):
+            for name in self.COLUMNS:
+                col = getattr(self, name)
+                setattr(self, name, np.concatenate((col, np.zeros_like(col)))) ## doubles the capacity
+        self.members.append(enemy)
+        self.count += 1
+        return self.count - 1
+
+    def remove(self, enemy):
+        ## swaps the last row into the hole, the removed enemy keeps its values in a one row swarm of its own
+        i, last = enemy.i, self.count - 1
+        alone = EnemySwarm(1)
+        alone.members.append(enemy)
+        alone.count = 1
+        for name in self.COLUMNS:
+            col = getattr(self, name)
+            getattr(alone, name)[0] = col[i]
+            col[i] = col[last]
+        moved = self.members.pop()
+        if moved is not enemy:
+            self.members[i] = moved
+            moved.i = i
+        self.count -= 1
+        enemy.swarm, enemy.i = alone, 0
+
+    def _separation(self, x, y, t):
+        ## summed push from every neighbour within SEPARATION px, for the rows t of x/y,
+        ## neighbours are found by sorting everyone into 90 px cells and searching the 9 cells around each enemy
+        cx, cy = grid_cells(x, y, SEPARATION)
+        grid = CellIndex(cell_keys(cx, cy))
+
+        sep_x = np.zeros(len(t))
+        sep_y = np.zeros(len(t))
+        for ox in (-1, 0, 1):
+            for oy in (-1, 0, 1):
+                rows, j = grid.lookup(cell_keys(cx[t] + ox, cy[t] + oy))
+                if not len(rows):
+                    continue
+                dx = x[t][rows] - x[j]
+                dy = y[t][rows] - y[j]
+                d2 = dx ** 2 + dy ** 2
+                near = (d2 > 0) & (d2 < SEPARATION * SEPARATION) ## skips itself and anyone on exactly the same spot
+                d = np.sqrt(d2[near])
+                strength = 1 - (d / SEPARATION)
+                sep_x += np.bincount(rows[near], (dx[near] / d) * strength, len(t))
+                sep_y += np.bincount(rows[near], (dy[near] / d) * strength, len(t))
+        return sep_x, sep_y
+
+    def track(self, members, player, dt, collides_array, tracking_range=400, min_range=50, flow=None):
+        ## Enemy.track and perform_attack for every swarm enemy in members at once,
+        ## separation only counts the swarm enemies passed in, same as track only sees the list it is given
+        idx = np.fromiter((e.i for e in members if getattr(e, "swarm", None) is self), np.intp)
+        if not len(idx):
+            return
+        x = self.x[idx]
+        y = self.y[idx]
+        dx = player.x - x
+        dy = player.y - y
+        dist = np.hypot(dx, dy)
+
+        ## Attack when in range
+        timer = self.attack_timer[idx] - dt
+        hits = (dist <= self.range[idx]) & (timer <= 0)
+        for damage in self.attack_damage[idx][hits].tolist():
+            player.take_damage(damage)
+        timer[hits] = self.attack_cooldown[idx][hits]
+        self.attack_timer[idx] = timer
+
+        tracking = (min_range < dist) & (dist < tracking_range)
+        self.tracking[idx] = tracking
+        idle = idx[~tracking]
+        self.anim_frame[idle] = 1 ## standing frame, same as update_anim(dt, False)
+        self.anim_time[idle] = 0.0
+
+        t = np.flatnonzero(tracking)
+        if not len(t):
+            return
+        rows = idx[t]
+        dist_t = dist[t]
+        sep_x, sep_y = self._separation(x, y, t)
+        move_x = dx[t] / dist_t
+        move_y = dy[t] / dist_t
+        if flow is not None:
+            flow_x, flow_y, has = flow.directions(x[t], y[t]) ## same lookup as track does with a flow field
+            move_x = np.where(has, flow_x, move_x)
+            move_y = np.where(has, flow_y, move_y)
+        move_x = move_x + sep_x
+        move_y = move_y + sep_y
+        mag = np.hypot(move_x, move_y)
+        moving = mag > 0
+        move_x[moving] /= mag[moving]
+        move_y[moving] /= mag[moving]
+
+        self.direction[rows] = np.where(np.abs(move_x) > np.abs(move_y),
+                                        np.where(move_x > 0, RIGHT, LEFT),
+                                        np.where(move_y > 0, DOWN, UP))
+        speed_factor = np.clip((tracking_range - dist_t) / tracking_range, 0.2, 1.0)
+        speed = self.speed[rows]
+
+        ## x then y separately, so enemies slide along walls like in track
+        old_x, old_y = x[t], y[t]
+        new_x = old_x + move_x * speed * speed_factor * dt
+        new_x = np.where(collides_array((new_x - 24).astype(np.int64), (old_y - 30).astype(np.int64), 48, 60), old_x, new_x)
+        new_y = old_y + move_y * speed * speed_factor * dt
+        blocked = collides_array((new_x - 24).astype(np.int64), (new_y - 30).astype(np.int64), 48, 60)
+        new_y = np.where(blocked, old_y, new_y)
+        self.x[rows] = new_x
+        self.y[rows] = new_y
+
+        ## track only advances the walk animation when the vertical move is blocked, kept the same here
+        walk = rows[blocked]
+        anim_time = self.anim_time[walk] + dt
+        step = anim_time >= 0.15
+        self.anim_frame[walk[step]] = (self.anim_frame[walk[step]] + 1) % 3
+        anim_time[step] = 0.0
+        self.anim_time[walk] = anim_time
+
+
+def _column(name, cast):
+    def get(self):
+        return cast(getattr(self.swarm, name)[self.i])
+
+    def set(self, value):
+        getattr(self.swarm, name)[self.i] = value
+    return property(get, set)
+
+
+def _get_direction(self):
+    return DIRECTIONS[self.swarm.direction[self.i]]
+
+
+def _set_direction(self, value):
+    self.swarm.direction[self.i] = DIRECTIONS.index(value)
+
+
+class SwarmEnemy(Enemy):
+    ## an Enemy whose moving state lives in an EnemySwarm row instead of on the object
+    x = _column("x", float)
+    y = _column("y", float)
+    hp = _column("hp", float)
+    speed = _column("speed", float)
+    attack_timer = _column("attack_timer", float)
+    attack_cooldown = _column("attack_cooldown", float)
+    range = _column("range", float)
+    attack_damage = _column("attack_damage", int)
+    anim_frame = _column("anim_frame", int)
+    anim_time = _column("anim_time", float)
+    tracking = _column("tracking", bool)
+    direction = property(_get_direction, _set_direction)
+    __slots__ = ("swarm", "i") ## the properties above take the place of Enemy's own slots
+
+    def __init__(self, swarm, *args):
+        self.swarm = swarm
+        self.i = swarm._add(self) ## the row has to exist before Enemy.__init__ sets x, y, hp...
+        super().__init__(*args)
@@ -0,0 +1,86 @@
+import os
+import threading
+from collections import OrderedDict
+import pygame
+
+## scaled picture tiles for the menus, kept by (path, size) so a page is only decoded and scaled once,
+## pages the player is likely to look at next are loaded on a worker thread while they look at this one
+
+
+class ThumbnailCache:
+    def __init__(self, max_tiles=48):
+        self.max_tiles = max_tiles ## least recently used tiles are dropped past this, ~150 KB each at 192x192
+        self.tiles = OrderedDict() ## (path, size) -> [surface, converted yet], most recently used last
+        self.lock = threading.Condition()
+        self.wanted = [] ## (path, size) for the worker, replaced on every prefetch so it never works on stale pages
+        self.worker = None
+        self.busy = False ## the worker is loading a tile right now
+        self.loads = 0 ## files decoded so far, on either thread, for the benchmarks
+
+    def _load(self, key):
+        path, size = key
+        surface = pygame.transform.scale(pygame.image.load(path), size)
+        self.loads += 1
+        return surface
+
+    def _store(self, key, surface, converted):
+        ## with the lock held
+        self.tiles[key] = [surface, converted]
+        self.tiles.move_to_end(key)
+        while len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+
+    def get(self, path, size):
+        ## the tile for path, loaded right here if the worker hasnt got to it yet
+        key = (os.path.normpath(path), tuple(size))
+        with self.lock:
+            entry = self.tiles.get(key)
+            if entry is not None:
+                self.tiles.move_to_end(key)
+        if entry is None:
+            entry = [self._load(key), False]
+            with self.lock:
+                self._store(key, *entry)
+        if not entry[1]:
+            entry[0] = entry[0].convert_alpha() ## only on the main thread, it needs the display
+            entry[1] = True
+        return entry[0]
+
+    def ready(self, path, size):
+        with self.lock:
+            return (os.path.normpath(path), tuple(size)) in self.tiles
+
+    def prefetch(self, paths, size):
+        ## loads paths in the background, in order, forgetting whatever was asked for before
+        keys = [(os.path.normpath(p), tuple(size)) for p in paths]
+        with self.lock:
+            self.wanted = [k for k in keys[:self.max_tiles // 2] if k not in self.tiles] ## leaves room for the page on screen
+            self.lock.notify()
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._work, name="thumbnails", daemon=True)
+            self.worker.start()
+
+    def idle(self):
+        with self.lock:
+            return not self.wanted and not self.busy
+
+    def _work(self):
+        while True:
+            with self.lock:
+                while not self.wanted:
+                    self.lock.wait()
+                key = self.wanted.pop(0)
+                if key in self.tiles:
+                    continue
+                self.busy = True
+            try:
+                surface = self._load(key) ## decoding and scaling happen without the lock held
+            except Exception:
+                surface = None ## a corrupt or unreadable file, skipped here, get() raises for it on the main thread if it is ever shown
+            with self.lock:
+                if surface is not None and key not in self.tiles:
+                    self._store(key, surface, False)
+                self.busy = False
+
+
+thumbnails = ThumbnailCache() ## shared by every menu, survives leaving and reopening character select
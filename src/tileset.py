@@ -0,0 +1,167 @@
+import os
+import xml.etree.ElementTree as ET
+import pygame
+
+FLIP_H = 0x80000000
+FLIP_V = 0x40000000
+FLIP_D = 0x20000000
+GID_MASK = 0x1FFFFFFF ## tiled packs the flip flags into the top 3 bits of every gid
+
+
+ATLAS_WIDTH = 1024 ## px, packed atlases wrap onto a new row after this
+
+
+class Tileset:
+    ## one .tsx tileset, the sheet is decoded and converted to the display format once,
+    ## then only the tiles a map uses are packed into a small atlas and the full sheet is dropped
+    def __init__(self, tsx_path, firstgid):
+        root = ET.parse(tsx_path).getroot()
+        self.firstgid = firstgid
+        self.name = root.get("name", "")
+        self.tile_w = int(root.get("tilewidth"))
+        self.tile_h = int(root.get("tileheight"))
+        self.tilecount = int(root.get("tilecount"))
+        self.columns = int(root.get("columns"))
+        self.spacing = int(root.get("spacing", 0))
+        self.margin = int(root.get("margin", 0))
+
+        self.animations = {} ## local tile id -> [(frame tile id, duration ms)]
+        for tile in root.findall("tile"):
+            anim = tile.find("animation")
+            if anim is not None:
+                self.animations[int(tile.get("id"))] = [(int(f.get("tileid")), int(f.get("duration")))
+                                                        for f in anim.findall("frame")]
+
+        image = root.find("image")
+        if image is None:
+            raise ValueError(f"{tsx_path}: image collection tilesets are not supported")
+
+        path = os.path.normpath(os.path.join(os.path.dirname(tsx_path), image.get("source")))
+        trans = image.get("trans")
+        sheet = pygame.image.load(path)
+        if trans:
+            self.colorkey = pygame.Color(f"#{trans}")
+            self.sheet = sheet.convert()
+            self.sheet.set_colorkey(self.colorkey, pygame.RLEACCEL) ## colorkey handled once for the whole sheet
+        else:
+            self.colorkey = None
+            self.sheet = sheet.convert_alpha()
+
+        self.atlas = None
+        self.slots = {} ## raw gid (with flip flags) -> rect in the atlas
+
+    def __contains__(self, gid):
+        return self.firstgid <= (gid & GID_MASK) < self.firstgid + self.tilecount
+
+    def frame_gids(self, gid):
+        ## every gid an animated tile can show, with the same flip flags as the tile itself
+        frames = self.animations.get((gid & GID_MASK) - self.firstgid, ())
+        flags = gid & ~GID_MASK
+        return [(self.firstgid + tile_id) | flags for tile_id, _ in frames]
+
+    def _cut(self, gid):
+        tile_id = (gid & GID_MASK) - self.firstgid
+        col = tile_id % self.columns
+        row = tile_id // self.columns
+        x = self.margin + col * (self.tile_w + self.spacing)
+        y = self.margin + row * (self.tile_h + self.spacing)
+        tile = self.sheet.subsurface(pygame.Rect(x, y, self.tile_w, self.tile_h))
+
+        if gid & FLIP_D:
+            tile = pygame.transform.flip(pygame.transform.rotate(tile, 270), True, False)
+        if gid & (FLIP_H | FLIP_V):
+            tile = pygame.transform.flip(tile, bool(gid & FLIP_H), bool(gid & FLIP_V))
+        return tile
+
+    def pack(self, gids):
+        ## copies just these tiles, flipped versions included, into one atlas and frees the sheet
+        gids = sorted(set(gids))
+        cols = max(1, min(len(gids), ATLAS_WIDTH // self.tile_w))
+        rows = max(1, -(-len(gids) // cols))
+        size = (cols * self.tile_w, rows * self.tile_h)
+
+        if self.colorkey is not None:
+            atlas = pygame.Surface(size).convert()
+            atlas.fill(self.colorkey)
+            flags = 0
+        else:
+            atlas = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+            atlas.fill((0, 0, 0, 0))
+            flags = pygame.BLEND_RGBA_MAX ## copies alpha exactly instead of blending onto the empty atlas
+
+        slots = {}
+        for i, gid in enumerate(gids):
+            rect = pygame.Rect((i % cols) * self.tile_w, (i // cols) * self.tile_h, self.tile_w, self.tile_h)
+            atlas.blit(self._cut(gid), rect, special_flags=flags)
+            slots[gid] = rect
+
+        if self.colorkey is not None:
+            atlas.set_colorkey(self.colorkey, pygame.RLEACCEL)
+        self.atlas = atlas
+        self.slots = slots
+        self.sheet = None
+
+    def tile(self, gid):
+        if self.atlas is not None:
+            return self.atlas.subsurface(self.slots[gid]) ## shares the atlas pixels and its colorkey
+        tile = self._cut(gid)
+        if self.colorkey is not None and tile.get_colorkey() is None:
+            tile.set_colorkey(self.colorkey, pygame.RLEACCEL) ## flipped tiles are new surfaces so they need the colorkey again
+        return tile
+
+    def animation(self, gid):
+        ## frames as [(surface, duration ms)] for an animated gid
+        frames = self.animations.get((gid & GID_MASK) - self.firstgid)
+        if not frames:
+            return None
+        return [(self.tile(frame_gid), duration) for frame_gid, (_, duration) in zip(self.frame_gids(gid), frames)]
+
+    def nbytes(self):
+        surf = self.atlas if self.atlas is not None else self.sheet
+        return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+
+def _owner(tilesets, gid):
+    for ts in tilesets:
+        if gid in ts:
+            return ts
+    return None
+
+
+def load_tilesets(tileset_refs, gids):
+    ## tileset_refs is [(firstgid, tsx path)] as stored in the compiled map, gids is the map's table of raw gids
+    ## every tileset only keeps the tiles the map actually uses, plus their animation frames
+    tilesets = [Tileset(path, firstgid) for firstgid, path in tileset_refs]
+    used = {id(ts): set() for ts in tilesets}
+    for gid in map(int, gids):
+        ts = _owner(tilesets, gid) if gid & GID_MASK else None
+        if ts is not None:
+            used[id(ts)].add(gid)
+            used[id(ts)].update(ts.frame_gids(gid))
+    for ts in tilesets:
+        if used[id(ts)]:
+            ts.pack(used[id(ts)])
+    return tilesets
+
+
+def load_tile_images(tilesets, gids):
+    ## returns a list the same length as gids so a tile index looks its surface up directly
+    images = [None] * len(gids)
+    for i, gid in enumerate(map(int, gids)):
+        if not gid & GID_MASK:
+            continue ## 0 means no tile
+        ts = _owner(tilesets, gid)
+        if ts is not None:
+            images[i] = ts.tile(gid)
+    return images
+
+
+def load_tile_animations(tilesets, gids):
+    ## tile index -> [(surface, duration ms)] for every animated tile the map uses
+    animations = {}
+    for i, gid in enumerate(map(int, gids)):
+        ts = _owner(tilesets, gid) if gid & GID_MASK else None
+        frames = ts.animation(gid) if ts is not None else None
+        if frames:
+            animations[i] = frames
+    return animations
@@ -0,0 +1,53 @@
+## fixed rate simulation for the game loop, the game is stepped by the same dt whatever the frame rate,
+## a slow frame runs several steps before drawing and a fast frame may run none and only draw again,
+## drawing puts things between their last two simulated positions so motion stays smooth either way
+
+
+class FixedStep:
+    def __init__(self, rate=60, max_steps=8, max_frame=0.25):
+        self.dt = 1 / rate ## seconds every step simulates
+        self.max_steps = max_steps ## most steps run before a frame is drawn, stops a slow machine spiralling
+        self.max_frame = max_frame ## longer frames (a blocking menu, dragging the window) count as this long
+        self.accumulator = 0.0 ## frame time not simulated yet, always less than one step after steps()
+        self.dropped = 0.0 ## simulation time thrown away because the machine couldnt keep up
+        self.previous = {} ## id(entity) -> (x, y) before the latest step
+
+    def steps(self, frame_dt):
+        ## how many steps to run for a frame that took frame_dt seconds
+        self.accumulator += min(frame_dt, self.max_frame)
+        count = min(int(self.accumulator / self.dt), self.max_steps)
+        self.accumulator -= count * self.dt
+        if self.accumulator >= self.dt:
+            behind = self.accumulator - self.accumulator % self.dt
+            self.dropped += behind
+            self.accumulator -= behind ## the game slows down instead of running ever more steps
+        return count
+
+    def alpha(self):
+        ## how far between the last two steps the drawn frame is, 0 is the previous step and 1 the latest
+        return min(1.0, self.accumulator / self.dt)
+
+    def snapshot(self, entities):
+        ## call before every step with everything that moves, so drawing can blend from there
+        self.previous = {id(e): (e.x, e.y) for e in entities}
+
+    def forget(self, entity):
+        ## for teleports, the entity is drawn where it is instead of sliding across the map
+        self.previous.pop(id(entity), None)
+
+    def blend(self, entities):
+        ## moves entities to their drawn positions, returns what restore needs to put them back
+        alpha = self.alpha()
+        moved = []
+        for e in entities:
+            before = self.previous.get(id(e))
+            if before is not None:
+                x, y = e.x, e.y
+                moved.append((e, x, y))
+                e.x = before[0] + (x - before[0]) * alpha
+                e.y = before[1] + (y - before[1]) * alpha
+        return moved
+
+    def restore(self, moved):
+        for e, x, y in moved:
+            e.x, e.y = x, y
@@ -23,3 +23,163 @@ class Button:
         pygame.draw.rect(surf, color, self.rect, border_radius=10)
         label = self.font.render(self.text, True, WHITE)
         surf.blit(label, label.get_rect(center=self.rect.center))
+
+
+## text from glyph atlases, every printable ascii character of a font and colour is rendered once,
+## strings are then put together from those glyphs instead of going through FreeType every time they change
+
+CHARS = "".join(chr(c) for c in range(32, 127))
+atlases = {} ## (font, colour) -> GlyphAtlas
+kerning = {} ## font -> pairs of characters whose spacing isnt just the two widths added up
+layouts = {} ## (font, text, colour, width) -> cached wrapped layout
+
+
+def kerned_pairs(font):
+    pairs = kerning.get(font)
+    if pairs is None:
+        width = {c: font.size(c)[0] for c in CHARS}
+        pairs = {a + b for a in CHARS for b in CHARS if font.size(a + b)[0] != width[a] + width[b]}
+        kerning[font] = pairs
+    return pairs
+
+
+class GlyphAtlas:
+    def __init__(self, font, color):
+        self.font = font
+        self.height = font.get_height()
+        rendered = [(c, font.render(c, True, color)) for c in CHARS]
+        self.surface = pygame.Surface((sum(s.get_width() for _, s in rendered), self.height), pygame.SRCALPHA)
+        self.glyphs = {} ## character -> (its inked part of the atlas surface, offset of that part in the character's box)
+        self.advance = {} ## character -> px to the next character
+        x = 0
+        for c, s in rendered:
+            self.surface.blit(s, (x, 0), special_flags=pygame.BLEND_RGBA_MAX) ## copies the glyph as is onto the empty atlas
+            ink = s.get_bounding_rect() ## only the visible pixels are blitted, the rest of the line height is see through
+            self.glyphs[c] = (self.surface.subsurface(ink.move(x, 0)), ink.topleft)
+            self.advance[c] = s.get_width()
+            x += s.get_width()
+        self.kerned = kerned_pairs(font)
+
+    def fits(self, text):
+        ## false when the string has a character outside the atlas or a kerned pair, those go through font.render
+        glyphs = self.glyphs
+        if not all(c in glyphs for c in text):
+            return False
+        return not self.kerned or not any(text[i:i + 2] in self.kerned for i in range(len(text) - 1))
+
+    def width(self, text):
+        advance = self.advance
+        return sum(advance[c] for c in text)
+
+    def pieces(self, text, x, y):
+        ## (glyph, position) for every character, ready for Surface.blits
+        glyphs, advance = self.glyphs, self.advance
+        out = []
+        for c in text:
+            glyph, (ox, oy) = glyphs[c]
+            if glyph.get_width():
+                out.append((glyph, (x + ox, y + oy)))
+            x += advance[c]
+        return out
+
+
+def get_atlas(font, color):
+    key = (font, tuple(color))
+    atlas = atlases.get(key)
+    if atlas is None:
+        atlas = atlases[key] = GlyphAtlas(font, color)
+    return atlas
+
+
+def text_width(font, text, color=WHITE):
+    atlas = get_atlas(font, color)
+    return atlas.width(text) if atlas.fits(text) else font.size(text)[0]
+
+
+def text_pieces(font, text, color, pos):
+    ## what blitting font.render(text) at pos would draw, as glyph blits
+    atlas = get_atlas(font, color)
+    if atlas.fits(text):
+        return atlas.pieces(text, *pos)
+    return [(font.render(text, True, color), pos)]
+
+
+def render_text(font, text, color):
+    ## the same surface font.render(text, True, color) gives, put together from the atlas
+    atlas = get_atlas(font, color)
+    if not atlas.fits(text):
+        return font.render(text, True, color)
+    surface = pygame.Surface((atlas.width(text), atlas.height), pygame.SRCALPHA)
+    for glyph, pos in atlas.pieces(text, 0, 0):
+        surface.blit(glyph, pos, special_flags=pygame.BLEND_RGBA_MAX)
+    return surface
+
+
+def wrap_text(font, text, width, color=WHITE):
+    ## breaks text into lines narrower than width at the spaces, a word longer than a line gets a line to itself
+    lines = []
+    current_line = ""
+    for word in text.split(" "):
+        test_line = current_line + word + " "
+        if text_width(font, test_line, color) < width:
+            current_line = test_line
+        else:
+            lines.append(current_line)
+            current_line = word + " "
+    lines.append(current_line)
+    return [line.strip() for line in lines]
+
+
+def layout_text(font, text, color, width, gap=5):
+    ## wrapped lines centred on x = 0 going down from y = 0, as one (surface, position) per line, made once per text
+    key = (font, text, tuple(color), width, gap)
+    pieces = layouts.get(key)
+    if pieces is None:
+        if len(layouts) > 256:
+            layouts.clear() ## only a handful of messages are on screen at once
+        pieces = []
+        y = 0
+        for line in wrap_text(font, text, width, color):
+            if line:
+                surface = render_text(font, line, color)
+                pieces.append((surface, (-(surface.get_width() // 2), y))) ## same place as a rect centred on 0
+            y += get_atlas(font, color).height + gap
+        layouts[key] = pieces
+    return pieces
+
+
+## menu screens sleep in pygame.event.wait until something happens instead of redrawing as fast as they can
+
+REDRAW_EVENTS = {pygame.KEYDOWN, pygame.VIDEOEXPOSE, pygame.VIDEORESIZE, pygame.WINDOWEXPOSED,
+                 pygame.WINDOWSIZECHANGED, pygame.WINDOWRESTORED, pygame.WINDOWFOCUSGAINED} ## anything that can change what is on screen
+
+
+class Leave:
+    ## returned from a screen's handle function to close it, run_screen then returns value
+    def __init__(self, value=None):
+        self.value = value
+
+
+def run_screen(draw, handle, animating=None, fps=60, idle_ms=250):
+    ## draw() draws the whole screen, handle(event) reacts to one event and returns Leave(value) to close the screen,
+    ## the screen is only drawn again after a key press or window event, or every frame up to fps while animating() is true
+    clock = pygame.time.Clock()
+    dirty = True
+    while True:
+        moving = animating is not None and animating()
+        if dirty or moving:
+            draw()
+            pygame.display.flip()
+            dirty = False
+        if moving:
+            clock.tick(fps)
+            events = pygame.event.get()
+        else:
+            event = pygame.event.wait(idle_ms) ## sleeps, wakes up now and then to see if an animation started
+            events = [] if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+        for e in events:
+            result = handle(e)
+            if isinstance(result, Leave):
+                return result.value
+            if e.type in REDRAW_EVENTS:
+                dirty = True
@@ -1,21 +1,329 @@
 import pygame
-import pytmx
+import numpy as np
+from collections import OrderedDict
 from classes import Character
+from mapcache import load_map
+from tileset import load_tilesets, load_tile_images, load_tile_animations
+from zones import Zone
+
+
+class TileAnimator:
+    ## shared clock for animated tiles, works out the current frame of each animated tile once per tick
+    ## instead of once for every place the tile is used on the map
+    def __init__(self, animations):
+        self.animations = animations ## tile index -> [(surface, duration ms)]
+        self.lengths = {tile_id: sum(d for _, d in frames) for tile_id, frames in animations.items()}
+        self.current = {tile_id: frames[0][0] for tile_id, frames in animations.items()} ## tile index -> surface to show now
+        self.version = 0 ## goes up every time any frame changes, chunks compare against it to know they are stale
+        self.next_change = 0 ## ms time of the soonest frame change, nothing is recalculated before it
+
+    def update(self, now_ms):
+        if now_ms < self.next_change:
+            return
+        changed = False
+        next_change = None
+        for tile_id, frames in self.animations.items():
+            t = now_ms % self.lengths[tile_id]
+            for surf, duration in frames:
+                if t < duration:
+                    break
+                t -= duration
+            if self.current[tile_id] is not surf:
+                self.current[tile_id] = surf
+                changed = True
+            until = now_ms + duration - t ## when this tile moves on to its next frame
+            if next_change is None or until < next_change:
+                next_change = until
+        self.next_change = next_change if next_change is not None else float("inf")
+        if changed:
+            self.version += 1
+
+
+class Chunk:
+    def __init__(self, surf, clear, animated, version):
+        self.surf = surf
+        self.clear = clear ## colour a cell is filled with before it is redrawn
+        self.animated = animated ## [(px, py, [tile index per layer])] for cells with an animated tile in them
+        self.version = version ## animator version the animated cells were last drawn at
+
+
+class ChunkCache:
+    ## bakes a stack of tile layers into fixed size chunk surfaces so drawing is a few big blits instead of one per tile
+    ## chunks are built lazily as the camera reaches them and the least recently used ones are dropped past the memory cap
+    def __init__(self, world, layers, chunk_tiles=16, max_mb=64, opaque=False):
+        self.world = world
+        self.layers = layers
+        self.chunk_tiles = chunk_tiles
+        self.chunk_w = chunk_tiles * world.tile_w
+        self.chunk_h = chunk_tiles * world.tile_h
+        self.cols = -(-world.map.width // chunk_tiles)
+        self.rows = -(-world.map.height // chunk_tiles) ## number of chunks across and down, rounded up for maps that dont divide evenly
+        self.opaque = opaque ## the bottom stack can be opaque which blits faster, the top stack needs alpha to show what is under it
+
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.bytes = 0
+        self.chunks = OrderedDict() ## (cx, cy) -> Chunk or None if the chunk is empty, oldest first
+
+    def _tile_image(self, tile_id):
+        animator = self.world.animator
+        if tile_id in animator.current:
+            return animator.current[tile_id]
+        return self.world.tile_images[tile_id]
+
+    def _bake(self, cx, cy):
+        tw, th = self.world.tile_w, self.world.tile_h
+        x0 = cx * self.chunk_tiles
+        y0 = cy * self.chunk_tiles
+        x1 = min(x0 + self.chunk_tiles, self.world.map.width)
+        y1 = min(y0 + self.chunk_tiles, self.world.map.height) ## tile range covered by the chunk, clipped at the map edge
+
+        animated_ids = self.world.animated_ids
+        tiles = []
+        animated = set()
+        for layer in self.layers:
+            window = layer.window(x0, y0, x1, y1)
+            ys, xs = np.nonzero(window) ## only visits tiles that are actually there
+            ids = window[ys, xs]
+            for y, x, tile_id in zip(ys.tolist(), xs.tolist(), ids.tolist()):
+                tile = self._tile_image(tile_id)
+                if tile:
+                    tiles.append((tile, (x * tw, y * th)))
+            if len(animated_ids):
+                moving = np.isin(ids, animated_ids)
+                animated.update(zip(xs[moving].tolist(), ys[moving].tolist()))
+        if not tiles:
+            return None ## empty chunks cost nothing to store or draw
+
+        size = ((x1 - x0) * tw, (y1 - y0) * th)
+        if self.opaque:
+            surf = pygame.Surface(size).convert()
+            clear = (0, 0, 0)
+        else:
+            ## the tileset uses a colorkey, so a chunk made only of colorkeyed tiles can keep that colorkey
+            ## which blits far faster than per pixel alpha, any tile with real alpha needs an alpha chunk instead
+            key = tiles[0][0].get_colorkey()
+            if key and all(tile.get_colorkey() == key for tile, _ in tiles):
+                surf = pygame.Surface(size).convert()
+                surf.set_colorkey(key, pygame.RLEACCEL)
+                clear = key
+            else:
+                surf = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+                clear = (0, 0, 0, 0)
+        surf.fill(clear)
+        surf.blits(tiles, doreturn=False)
+
+        ## remembers the whole stack under each animated cell so the cell can be redrawn on its own later
+        cells = [(x * tw, y * th, [int(layer.data[y0 + y, x0 + x]) for layer in self.layers]) for x, y in sorted(animated)]
+        return Chunk(surf, clear, cells, self.world.animator.version)
+
+    def _refresh(self, chunk):
+        ## redraws only the animated cells with the frames the animator is showing now
+        tw, th = self.world.tile_w, self.world.tile_h
+        surf = chunk.surf
+        for px, py, stack in chunk.animated:
+            surf.fill(chunk.clear, (px, py, tw, th))
+            for tile_id in stack:
+                if tile_id:
+                    tile = self._tile_image(tile_id)
+                    if tile:
+                        surf.blit(tile, (px, py))
+        chunk.version = self.world.animator.version
+
+    def get(self, cx, cy):
+        key = (cx, cy)
+        if key in self.chunks:
+            self.chunks.move_to_end(key) ## marks it as most recently used
+            chunk = self.chunks[key]
+            if chunk is not None and chunk.animated and chunk.version != self.world.animator.version:
+                self._refresh(chunk)
+            return chunk
+
+        chunk = self._bake(cx, cy)
+        self.chunks[key] = chunk
+        if chunk is not None:
+            self.bytes += chunk.surf.get_width() * chunk.surf.get_height() * chunk.surf.get_bytesize()
+
+        while self.bytes > self.max_bytes and len(self.chunks) > 1: ## evicts oldest chunks, always keeping the one just built
+            _, old = self.chunks.popitem(last=False)
+            if old is not None:
+                self.bytes -= old.surf.get_width() * old.surf.get_height() * old.surf.get_bytesize()
+        return chunk
+
+    def clear(self):
+        self.chunks.clear()
+        self.bytes = 0
+
+    def visible(self, cam_x, cam_y, area):
+        ## (cx, cy) of every chunk overlapping area, which is a rect in screen space
+        start_cx = max(0, (cam_x + area.left) // self.chunk_w)
+        start_cy = max(0, (cam_y + area.top) // self.chunk_h)
+        end_cx = min(self.cols, (cam_x + area.right - 1) // self.chunk_w + 1)
+        end_cy = min(self.rows, (cam_y + area.bottom - 1) // self.chunk_h + 1)
+        return [(cx, cy) for cy in range(start_cy, end_cy) for cx in range(start_cx, end_cx)]
+
+    def draw(self, screen, cam_x, cam_y, area=None):
+        ## area limits drawing to part of the screen, used when only a strip needs repainting
+        clipped = area is not None
+        if clipped:
+            screen.set_clip(area)
+        else:
+            area = screen.get_rect()
+
+        for cx, cy in self.visible(cam_x, cam_y, area): ## only the chunks that overlap the screen
+            chunk = self.get(cx, cy)
+            if chunk is not None:
+                screen.blit(chunk.surf, (cx * self.chunk_w - cam_x, cy * self.chunk_h - cam_y))
+
+        if clipped:
+            screen.set_clip(None)
+
+
+class ScrollRenderer:
+    ## opt in background renderer for small camera moves, keeps last frame's background and shifts it
+    ## by the camera delta with Surface.scroll so only the newly exposed strips have to be drawn
+    def __init__(self, cache, max_step=128):
+        self.cache = cache
+        self.max_step = max_step ## camera jumps bigger than this just redraw everything
+        self.surf = None
+        self.cam = None ## camera the kept background was drawn at, None forces a full redraw
+        self.version = None ## animator version the kept background was drawn at
+
+    def invalidate(self):
+        self.cam = None ## used after teleports so the next frame is drawn from scratch
+
+    def _redraw_animated(self, cam_x, cam_y):
+        ## copies the freshly animated cells from their chunks onto the kept background
+        tw, th = self.cache.world.tile_w, self.cache.world.tile_h
+        for cx, cy in self.cache.visible(cam_x, cam_y, self.surf.get_rect()):
+            chunk = self.cache.get(cx, cy) ## refreshes the chunk's own animated cells first
+            if chunk is None:
+                continue
+            ox = cx * self.cache.chunk_w - cam_x
+            oy = cy * self.cache.chunk_h - cam_y
+            for px, py, _ in chunk.animated:
+                self.surf.blit(chunk.surf, (ox + px, oy + py), (px, py, tw, th))
+
+    def draw(self, screen, cam_x, cam_y):
+        size = screen.get_size()
+        if self.surf is None or self.surf.get_size() != size:
+            self.surf = pygame.Surface(size).convert()
+            self.cam = None
+
+        version = self.cache.world.animator.version
+        if self.cam is None:
+            full = True
+        else:
+            dx = cam_x - self.cam[0]
+            dy = cam_y - self.cam[1]
+            full = abs(dx) > self.max_step or abs(dy) > self.max_step or abs(dx) >= size[0] or abs(dy) >= size[1]
+
+        if full:
+            self.surf.fill((0, 0, 0))
+            self.cache.draw(self.surf, cam_x, cam_y)
+        elif dx or dy:
+            self.surf.scroll(-dx, -dy)
+            sw, sh = size
+            strips = []
+            if dx > 0:
+                strips.append(pygame.Rect(sw - dx, 0, dx, sh)) ## strip exposed on the right
+            elif dx < 0:
+                strips.append(pygame.Rect(0, 0, -dx, sh))
+            if dy > 0:
+                strips.append(pygame.Rect(0, sh - dy, sw, dy)) ## strip exposed at the bottom
+            elif dy < 0:
+                strips.append(pygame.Rect(0, 0, sw, -dy))
+            for strip in strips:
+                self.surf.fill((0, 0, 0), strip) ## empty and off map chunks draw nothing, same black as a full redraw
+                self.cache.draw(self.surf, cam_x, cam_y, strip)
+
+        if not full and version != self.version:
+            self._redraw_animated(cam_x, cam_y)
+
+        self.cam = (cam_x, cam_y)
+        self.version = version
+        screen.blit(self.surf, (0, 0))
+
+
+class CollisionGrid:
+    ## static bucket index over the collision rects, built once at load so a query only tests the rects in the cells it overlaps
+    def __init__(self, rects, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {} ## (cx, cy) -> list of rects touching that cell
+        for rect in rects:
+            for key in self._cells_for(rect):
+                self.cells.setdefault(key, []).append(rect)
+
+    def _cells_for(self, rect):
+        cs = self.cell_size
+        for cy in range(rect.top // cs, (rect.bottom - 1) // cs + 1):
+            for cx in range(rect.left // cs, (rect.right - 1) // cs + 1):
+                yield (cx, cy)
+
+    def collides(self, rect):
+        cells = self.cells
+        for key in self._cells_for(rect):
+            bucket = cells.get(key)
+            if bucket and rect.collidelist(bucket) != -1: ## collidelist does the loop in C
+                return True
+        return False
+
+    def collides_many(self, rects):
+        ## batch query for lots of rects at once, saves the per call overhead when checking a whole group of enemies
+        cells = self.cells
+        cs = self.cell_size
+        hits = []
+        for rect in rects:
+            hit = False
+            for cy in range(rect.top // cs, (rect.bottom - 1) // cs + 1):
+                for cx in range(rect.left // cs, (rect.right - 1) // cs + 1):
+                    bucket = cells.get((cx, cy))
+                    if bucket and rect.collidelist(bucket) != -1:
+                        hit = True
+                        break
+                if hit:
+                    break
+            hits.append(hit)
+        return hits
+
+
+EMPTY, PARTIAL, SOLID = 0, 1, 2 ## values in the tile solidity bitmap, PARTIAL tiles need an exact rect check
+
+
 class World:
-    def __init__(self, tmx_path):
-        self.tmx = pytmx.load_pygame(tmx_path)
-        self.tile_w = self.tmx.tilewidth
-        self.tile_h = self.tmx.tileheight
+    def __init__(self, tmx_path, chunk_tiles=16, cache_mb=64, solid_layers=(), scroll_reuse=False):
+        self.map = load_map(tmx_path) ## compiled and memory mapped, only re-parses the tmx when it changes
+        tilesets = load_tilesets(self.map.tilesets, self.map.gids) ## decodes each sheet once and keeps only the tiles this map uses
+        self.tile_images = load_tile_images(tilesets, self.map.gids) ## tile index -> Surface
+        self.animator = TileAnimator(load_tile_animations(tilesets, self.map.gids))
+        self.animated_ids = np.array(sorted(self.animator.animations), np.uint16) ## tile indexes that animate
+        self.tile_w = self.map.tile_w
+        self.tile_h = self.map.tile_h
 
-        self.width_px = self.tmx.width * self.tile_w
-        self.height_px = self.tmx.height * self.tile_h
+        self.width_px = self.map.width * self.tile_w
+        self.height_px = self.map.height * self.tile_h
 
         self.collision_rects = []
         self._load_collisions()
+        self.solid = np.zeros((self.map.height, self.map.width), np.uint8) ## per tile solidity bitmap [y, x]
+        self._load_solid_tiles(solid_layers)
+        self._rasterize_collisions()
+        self.solid_rows = [row.tobytes() for row in self.solid] ## bytes per row, much cheaper to index than numpy for tiny queries
+        self.collision_grid = CollisionGrid(self.collision_rects)
+        self.enemy_zones = self._load_enemy_zones()
+
+        bg_layers = self._tile_layers("bg")
+        fg_layers = self._tile_layers("fg")
+        ## the memory cap is split between both stacks, the background is opaque so it gets its own half
+        self.bg_cache = ChunkCache(self, bg_layers, chunk_tiles, cache_mb / 2, opaque=True)
+        self.fg_cache = ChunkCache(self, fg_layers, chunk_tiles, cache_mb / 2)
+        self.scroller = ScrollRenderer(self.bg_cache) if scroll_reuse else None ## opt in, reuses last frame's background
+
+    def _tile_layers(self, tag):
+        return [layer for layer in self.map.layers if layer.visible and tag in layer.name.lower()]
 
     def _load_collisions(self):
-        for layer in self.tmx.layers:
-            if getattr(layer, "name", None) == "Collisions":
+        for layer in self.map.objectgroups:
+            if layer.name == "Collisions":
                 for obj in layer:
                     # These attributes only exist on Object Layers
                     x = int(obj.x)
@@ -26,44 +334,137 @@ class World:
                     if w > 0 and h > 0:
                         self.collision_rects.append(pygame.Rect(x, y, w, h))
 
+    def _load_enemy_zones(self):
+        ## the "Enemy Bounds" objects are the areas enemies live in, used to put far away enemies to sleep
+        zones = []
+        layer = self.map.get_layer("Enemy Bounds")
+        for obj in (layer if layer is not None else []):
+            if obj.width > 0 and obj.height > 0:
+                zones.append(Zone(obj.x, obj.y, obj.width, obj.height, ellipse=obj.shape == "ellipse"))
+        return zones
 
+    def _load_solid_tiles(self, names):
+        ## every non empty tile on these tile layers is solid, each run of solid tiles in a row
+        ## also becomes one rect so the exact collision path sees exactly the same walls
+        for name in names:
+            layer = self.map.get_layer(name)
+            if layer is None:
+                continue
+            self.solid[layer.data != 0] = SOLID
+            for y in range(layer.height):
+                for x0, x1 in layer.row_runs(y, 0, layer.width):
+                    self.collision_rects.append(pygame.Rect(x0 * self.tile_w, y * self.tile_h,
+                                                            (x1 - x0) * self.tile_w, self.tile_h))
 
-    def draw(self, screen, cam_x=0, cam_y=0, player=None):
-        sw, sh = screen.get_size()
+    def _rasterize_collisions(self):
+        ## tiles completely inside a rect are SOLID, tiles it only partly covers are PARTIAL
+        tw, th = self.tile_w, self.tile_h
+        for rect in self.collision_rects:
+            tx0 = max(0, rect.left // tw)
+            ty0 = max(0, rect.top // th)
+            tx1 = min(self.map.width, (rect.right - 1) // tw + 1)
+            ty1 = min(self.map.height, (rect.bottom - 1) // th + 1) ## every tile the rect touches
+            if tx0 >= tx1 or ty0 >= ty1:
+                continue
+            cells = self.solid[ty0:ty1, tx0:tx1]
+            np.maximum(cells, PARTIAL, out=cells)
 
-        start_x = max(0, cam_x // self.tile_w)
-        start_y = max(0, cam_y // self.tile_h)
+            fx0 = max(0, -(-rect.left // tw))
+            fy0 = max(0, -(-rect.top // th))
+            fx1 = min(self.map.width, rect.right // tw)
+            fy1 = min(self.map.height, rect.bottom // th) ## only the tiles the rect fully covers
+            if fx0 < fx1 and fy0 < fy1:
+                self.solid[fy0:fy1, fx0:fx1] = SOLID
 
-        end_x = min(self.tmx.width, (cam_x + sw) // self.tile_w + 2)
-        end_y = min(self.tmx.height, (cam_y + sh) // self.tile_h + 2)
 
-        for layer in self.tmx.visible_layers:
-            if 'bg' in getattr(layer, "name", "").lower():
-                if isinstance(layer, pytmx.TiledTileLayer):
-                    for y in range(start_y, end_y):
-                        for x in range(start_x, end_x):
-                            gid = layer.data[y][x]
-                            if gid:
-                                tile = self.tmx.get_tile_image_by_gid(gid)
-                                if tile:
-                                    screen.blit(tile, (x*self.tile_w - cam_x, y*self.tile_h - cam_y))
+    def draw(self, screen, cam_x=0, cam_y=0, player=None):
+        self.animator.update(pygame.time.get_ticks())
+        if self.scroller is not None:
+            self.scroller.draw(screen, cam_x, cam_y)
+        else:
+            self.bg_cache.draw(screen, cam_x, cam_y)
 
         player.draw(screen, cam_x, cam_y)
-        player.pet.update_pet(player, screen, cam_x, cam_y)      
+        player.pet.draw(screen, cam_x, cam_y) ## moved and animated in the simulation step
         
-        for layer in self.tmx.visible_layers:
-            if 'fg' in getattr(layer, "name", "").lower():
-                if isinstance(layer, pytmx.TiledTileLayer):
-                    for y in range(start_y, end_y):
-                        for x in range(start_x, end_x):
-                            gid = layer.data[y][x]
-                            if gid:
-                                tile = self.tmx.get_tile_image_by_gid(gid)
-                                if tile:
-                                    screen.blit(tile, (x*self.tile_w - cam_x, y*self.tile_h - cam_y))
+        self.fg_cache.draw(screen, cam_x, cam_y)
+
+    def invalidate_view(self):
+        ## the camera jumped somewhere new, e.g. a teleport, so nothing from the last frame can be reused
+        if self.scroller is not None:
+            self.scroller.invalidate()
 
     def collides(self, rect: pygame.Rect):
         
         if not self.collision_rects:
             return False
-        return any(rect.colliderect(c) for c in self.collision_rects)
+        return self.collision_grid.collides(rect)
+
+    def collides_many(self, rects):
+        return self.collision_grid.collides_many(rects) ## one result per rect, in the same order
+
+    def collides_fast(self, rect: pygame.Rect):
+        ## same answer as collides, but most rects are settled by the tile bitmap alone
+        tw, th = self.tile_w, self.tile_h
+        if rect.width <= 0 or rect.height <= 0:
+            return False
+        if rect.left < 0 or rect.top < 0 or rect.right > self.width_px or rect.bottom > self.height_px:
+            return self.collides(rect) ## the bitmap only covers the map itself
+
+        tx0 = rect.left // tw
+        tx1 = (rect.right - 1) // tw + 1
+        partial = False
+        for row in self.solid_rows[rect.top // th:(rect.bottom - 1) // th + 1]:
+            cells = row[tx0:tx1]
+            if SOLID in cells:
+                return True
+            if PARTIAL in cells:
+                partial = True
+        if partial:
+            return self.collision_grid.collides(rect) ## only partly covered tiles need the exact check
+        return False
+
+    def collides_array(self, left, top, width, height):
+        ## collides_fast for a whole batch of rects at once, takes int arrays (or single ints for the size)
+        ## and returns a bool array, only rects on PARTIAL tiles or off the map fall back to the exact check
+        left = np.asarray(left, np.int64)
+        top = np.asarray(top, np.int64)
+        width = np.broadcast_to(np.asarray(width, np.int64), left.shape)
+        height = np.broadcast_to(np.asarray(height, np.int64), left.shape)
+        right = left + width
+        bottom = top + height
+        hit = np.zeros(left.shape, bool)
+
+        empty = (width <= 0) | (height <= 0)
+        inside = ~empty & (left >= 0) & (top >= 0) & (right <= self.width_px) & (bottom <= self.height_px)
+        i = np.flatnonzero(inside)
+        if len(i):
+            tx0 = left[i] // self.tile_w
+            ty0 = top[i] // self.tile_h
+            span_x = (right[i] - 1) // self.tile_w + 1 - tx0
+            span_y = (bottom[i] - 1) // self.tile_h + 1 - ty0
+            cells = np.zeros(len(i), np.uint8)
+            for oy in range(int(span_y.max())):
+                for ox in range(int(span_x.max())):
+                    vals = self.solid[np.minimum(ty0 + oy, self.map.height - 1), np.minimum(tx0 + ox, self.map.width - 1)]
+                    vals[(oy >= span_y) | (ox >= span_x)] = EMPTY ## smaller rects dont reach this far
+                    np.maximum(cells, vals, out=cells) ## SOLID wins over PARTIAL wins over EMPTY
+            hit[i] = cells == SOLID
+            for k in i[cells == PARTIAL].tolist():
+                hit[k] = self.collision_grid.collides(pygame.Rect(int(left[k]), int(top[k]), int(width[k]), int(height[k])))
+
+        for k in np.flatnonzero(~empty & ~inside).tolist():
+            hit[k] = self.collides(pygame.Rect(int(left[k]), int(top[k]), int(width[k]), int(height[k])))
+        return hit
+
+    def collides_point(self, x, y):
+        tx = int(x) // self.tile_w
+        ty = int(y) // self.tile_h
+        if not (0 <= tx < self.map.width and 0 <= ty < self.map.height):
+            return any(c.collidepoint(x, y) for c in self.collision_rects)
+        cell = self.solid_rows[ty][tx]
+        if cell == PARTIAL:
+            return any(c.collidepoint(x, y) for c in self.collision_grid.cells.get(
+                (int(x) // self.collision_grid.cell_size, int(y) // self.collision_grid.cell_size), ()))
+        return cell == SOLID
+
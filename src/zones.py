@@ -0,0 +1,108 @@
+import math
+
+## enemies are bound to zones, zones far from the player sleep so their enemies are not updated,
+## collided or drawn at all, they keep every bit of their state and carry on when the zone wakes up
+
+
+class Zone:
+    def __init__(self, x, y, w, h, ellipse=False):
+        self.x, self.y, self.w, self.h = x, y, w, h
+        self.ellipse = ellipse ## tiled ellipses are stored as their bounding box
+        self.enemies = []
+        self.awake = False
+
+    def contains(self, x, y):
+        if not (self.x <= x <= self.x + self.w and self.y <= y <= self.y + self.h):
+            return False
+        if not self.ellipse:
+            return True
+        rx, ry = self.w / 2, self.h / 2
+        if rx <= 0 or ry <= 0:
+            return False
+        dx = (x - self.x - rx) / rx
+        dy = (y - self.y - ry) / ry
+        return dx * dx + dy * dy <= 1
+
+    def distance_to(self, x, y):
+        dx = max(self.x - x, 0, x - self.x - self.w)
+        dy = max(self.y - y, 0, y - self.y - self.h)
+        return math.hypot(dx, dy) ## to the bounding box, 0 when inside
+
+
+class EnemyZones:
+    ## enemies inside one of the map's zones belong to it, everything else falls into square grid zones
+    def __init__(self, zones, enemies=(), wake_radius=1000, sleep_margin=200, grid_size=512):
+        self.zones = list(zones)
+        self.grid = {} ## (cx, cy) -> Zone for enemies outside every map zone
+        self.grid_size = grid_size
+        self.wake_radius = wake_radius ## zones closer than this to the player wake up
+        self.sleep_margin = sleep_margin ## and only go back to sleep a bit further out so they dont flicker on the edge
+        self.always = [] ## bosses, never put to sleep
+        self.zone_of = {} ## id(enemy) -> Zone
+        self.active = []
+        for enemy in enemies:
+            self.add(enemy)
+
+    def _zone_at(self, x, y):
+        for zone in self.zones:
+            if zone.contains(x, y):
+                return zone
+        key = (int(x // self.grid_size), int(y // self.grid_size))
+        zone = self.grid.get(key)
+        if zone is None:
+            zone = self.grid[key] = Zone(key[0] * self.grid_size, key[1] * self.grid_size, self.grid_size, self.grid_size)
+        return zone
+
+    def add(self, enemy, always=False):
+        if always:
+            self.always.append(enemy)
+            return
+        zone = self._zone_at(enemy.x, enemy.y)
+        zone.enemies.append(enemy)
+        self.zone_of[id(enemy)] = zone
+
+    def remove(self, enemy):
+        zone = self.zone_of.pop(id(enemy), None)
+        if zone is not None:
+            zone.enemies.remove(enemy)
+        elif enemy in self.always:
+            self.always.remove(enemy)
+        if enemy in self.active:
+            self.active.remove(enemy)
+
+    def __iter__(self):
+        ## every enemy on the map, asleep or not
+        for zone in self.zones + list(self.grid.values()):
+            yield from zone.enemies
+        yield from self.always
+
+    def __len__(self):
+        return len(self.zone_of) + len(self.always)
+
+    def update(self, x, y):
+        ## wakes and sleeps zones around (x, y) and returns the enemies to run this frame
+        active = list(self.always)
+        moved = []
+        for zone in self.zones + list(self.grid.values()):
+            if not zone.enemies:
+                zone.awake = False
+                continue
+            dist = zone.distance_to(x, y)
+            if zone.awake:
+                zone.awake = dist < self.wake_radius + self.sleep_margin
+            else:
+                zone.awake = dist < self.wake_radius
+            if zone.awake:
+                for enemy in zone.enemies:
+                    active.append(enemy)
+                    if not zone.contains(enemy.x, enemy.y):
+                        moved.append((enemy, zone)) ## chased the player out of its zone
+        for enemy, zone in moved:
+            new_zone = self._zone_at(enemy.x, enemy.y)
+            if new_zone is not zone:
+                zone.enemies.remove(enemy)
+                new_zone.enemies.append(enemy)
+                new_zone.awake = True ## its enemy is next to the player, so it must not fall asleep under it
+                self.zone_of[id(enemy)] = new_zone
+        self.active = active
+        return active